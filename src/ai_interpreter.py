@@ -1,45 +1,167 @@
-def generate_sky_description(
-    location,
-    date,
-    time,
-    moon_phase,
-    moon_visibility,
-    moon_brightness,
-    visible_planets,
-    cloud_cover,
-):
-    planets_text = ", ".join(visible_planets) if visible_planets else "no major planets"
-
-    # Visibility meaning text
-    if moon_visibility == "Below horizon":
-        moon_sentence = "The Moon is currently below the horizon and not visible."
-    elif moon_visibility == "Cloud obscured":
-        moon_sentence = "The Moon is above the horizon, but cloud cover is obscuring visibility."
-    else:
-        moon_sentence = "The Moon is clearly visible in the night sky."
-
-    # Cloud interpretation
+from itertools import combinations
+
+from geo import PRESET_CITIES
+
+
+MOON_SENTENCES = {
+    "Below horizon": "The Moon is currently below the horizon and not visible.",
+    "Cloud obscured": "The Moon is above the horizon, but cloud cover is obscuring visibility.",
+    "Visible": "The Moon is clearly visible in the night sky.",
+}
+
+SKY_CONDITIONS = (
+    "clear and suitable for sky observation",
+    "partly cloudy with moderate viewing conditions",
+    "heavily clouded, limiting sky visibility",
+)
+
+PHASE_NAMES = (
+    "New Moon",
+    "Crescent",
+    "First Quarter / Half Moon",
+    "Gibbous",
+    "Full Moon",
+)
+
+CLOSING_SENTENCE = (
+    "Overall, this moment in the sky reflects a calm celestial scene, "
+    "with subtle atmospheric variations influencing visibility."
+)
+
+# location labels the app itself produces (everything else is free text)
+KNOWN_LOCATIONS = (*PRESET_CITIES, "My Location", "Custom Location", "Unknown")
+
+MONTHS = (
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+)
+
+
+def moon_sentence(moon_visibility):
+    return MOON_SENTENCES.get(moon_visibility, MOON_SENTENCES["Visible"])
+
+
+def sky_condition(cloud_cover):
     if cloud_cover < 20:
-            sky_condition = "clear and suitable for sky observation"
+        return SKY_CONDITIONS[0]
     elif cloud_cover < 50:
-            sky_condition = "partly cloudy with moderate viewing conditions"
-    else:
-            sky_condition = "heavily clouded, limiting sky visibility"
+        return SKY_CONDITIONS[1]
+    return SKY_CONDITIONS[2]
+
+
+def planets_text(visible_planets):
+    return ", ".join(visible_planets) if visible_planets else "no major planets"
+
+
+def generate_sky_description(snapshot, location):
+    """
+    Builds the narration text for a SkySnapshot seen from `location`.
+    """
+    dt = snapshot.datetime_utc
 
     description = f"""
 📍 **Location:** {location}  
-🕒 **Time:** {time.strftime("%I:%M %p")}  
-📅 **Date:** {date.strftime("%d %B %Y")}
+🕒 **Time:** {dt.strftime("%I:%M %p")}  
+📅 **Date:** {dt.strftime("%d %B %Y")}
 
-The sky tonight is **{sky_condition}**.
+The sky tonight is **{sky_condition(snapshot.cloud_cover or 0)}**.
 
-🌙 The Moon is in **{moon_phase}** phase with approximately **{moon_brightness:.1f}% illumination**.  
-{moon_sentence}
+🌙 The Moon is in **{snapshot.moon_phase_name}** phase with approximately **{snapshot.moon_illumination:.1f}% illumination**.  
+{moon_sentence(snapshot.moon_status)}
 
-🪐 Visible planets at this time include **{planets_text}**.
+🪐 Visible planets at this time include **{planets_text(snapshot.visible_planets)}**.
 
 ✨ Overall, this moment in the sky reflects a calm celestial scene,
 with subtle atmospheric variations influencing visibility.
 """
 
     return description
+
+
+# ===============================
+# Segmented narration (clip library)
+# ===============================
+def _time_segments(dt):
+    hour = dt.hour % 12 or 12
+    segments = [str(hour)]
+    if dt.minute:
+        segments.append(f"{dt.minute}" if dt.minute >= 10 else f"oh {dt.minute}")
+    segments.append("PM" if dt.hour >= 12 else "AM")
+    return segments
+
+
+def _percent_segments(value):
+    # same rounding as the "{:.1f}%" in the written description
+    whole, tenth = f"{value:.1f}".split(".")
+    return [whole, f"point {tenth} percent illumination."]
+
+
+def narration_segments(snapshot, location):
+    """
+    The spoken version of generate_sky_description() as a list of
+    (text, reusable) pieces. Reusable pieces come from small finite sets
+    (see clip_vocabulary) and can be served from pre-synthesized clips;
+    only free-text locations need live TTS.
+    """
+    dt = snapshot.datetime_utc
+
+    segments = [("Location:", True), (location, location in KNOWN_LOCATIONS)]
+
+    segments.append(("Time:", True))
+    segments += [(s, True) for s in _time_segments(dt)]
+
+    segments += [
+        ("Date:", True),
+        (str(dt.day), True),
+        (MONTHS[dt.month - 1], True),
+        (str(dt.year), True),
+    ]
+
+    segments.append((f"The sky tonight is {sky_condition(snapshot.cloud_cover or 0)}.", True))
+
+    segments.append((
+        f"The Moon is in {snapshot.moon_phase_name} phase with approximately",
+        True,
+    ))
+    segments += [(s, True) for s in _percent_segments(snapshot.moon_illumination)]
+    segments.append((moon_sentence(snapshot.moon_status), True))
+
+    segments.append((
+        f"Visible planets at this time include {planets_text(snapshot.visible_planets)}.",
+        True,
+    ))
+
+    segments.append((CLOSING_SENTENCE, True))
+
+    return segments
+
+
+def clip_vocabulary(first_year=1900, last_year=2100):
+    """
+    Every reusable segment narration_segments() can produce.
+    """
+    vocab = ["Location:", "Time:", "Date:", "AM", "PM", CLOSING_SENTENCE]
+    vocab += KNOWN_LOCATIONS
+
+    vocab += [str(h) for h in range(1, 13)]
+    vocab += [f"oh {m}" for m in range(1, 10)] + [str(m) for m in range(10, 60)]
+
+    vocab += [str(d) for d in range(1, 32)]
+    vocab += MONTHS
+    vocab += [str(y) for y in range(first_year, last_year + 1)]
+
+    vocab += [f"The sky tonight is {c}." for c in SKY_CONDITIONS]
+    vocab += [f"The Moon is in {p} phase with approximately" for p in PHASE_NAMES]
+    vocab += [str(n) for n in range(0, 101)]
+    vocab += [f"point {d} percent illumination." for d in range(10)]
+    vocab += list(MOON_SENTENCES.values())
+
+    from snapshot import PLANETS
+
+    names = list(PLANETS)
+    for k in range(len(names) + 1):
+        for combo in combinations(names, k):
+            vocab.append(f"Visible planets at this time include {planets_text(list(combo))}.")
+
+    # numbers overlap between hours, days and percentages
+    return list(dict.fromkeys(vocab))
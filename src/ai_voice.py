@@ -1,25 +1,304 @@
 from gtts import gTTS
 from pathlib import Path
+import hashlib
+import io
+import os
+import queue
+import re
+import threading
+import time
 import uuid
 
+import requests
+
+from ai_interpreter import generate_sky_description, narration_segments, clip_vocabulary
+from singleflight import SingleFlight
+
 OUTPUT_DIR = Path("assets/audio")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Optional plain-HTTP TTS endpoint (GET ?q=<text>&tl=en -> MP3), used
+# instead of gTTS when set, e.g. by the load-test stand-in
+TTS_URL = os.environ.get("ASTRO_TTS_URL")
+
+# seconds per TTS HTTP request, and for a whole narration to be assembled
+TTS_TIMEOUT = float(os.environ.get("ASTRO_TTS_TIMEOUT", 10))
+NARRATION_TIMEOUT = float(os.environ.get("ASTRO_NARRATION_TIMEOUT", 60))
+
+# identical phrases requested together are synthesized once
+_tts_flight = SingleFlight("tts", timeout=30)
+
+
 def generate_voice_narration(text: str):
     """
     Converts AI sky description text into spoken narration
     and returns generated audio file path
     """
-
     file_id = uuid.uuid4().hex[:8]
     file_path = OUTPUT_DIR / f"sky_voice_{file_id}.mp3"
 
     tts = gTTS(
         text=text,
         lang="en",
-        slow=False
+        slow=False,
+        timeout=TTS_TIMEOUT
     )
 
     tts.save(file_path)
 
     return str(file_path)
+
+
+# ===============================
+# Streaming narration
+# ===============================
+def split_sentences(text: str):
+    """
+    Splits narration text into speakable sentences (markdown removed).
+    """
+    text = text.replace("*", "")
+
+    sentences = []
+    # blank lines and markdown hard breaks end a sentence, plain wraps don't
+    for block in re.split(r" {2,}\n|\n\s*\n", text):
+        block = " ".join(block.split())
+        sentences.extend(re.split(r"(?<=[.!?])\s+", block))
+
+    return [s for s in sentences if re.search(r"\w", s)]
+
+
+def synthesize_sentence(sentence: str):
+    """
+    Returns the MP3 bytes for one sentence.
+    """
+    buf = io.BytesIO()
+    gTTS(text=sentence, lang="en", slow=False, timeout=TTS_TIMEOUT).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def synthesize_sentence_http(sentence: str):
+    """
+    Same as synthesize_sentence, via the ASTRO_TTS_URL endpoint.
+    """
+    response = requests.get(TTS_URL, params={"q": sentence, "tl": "en"},
+                            timeout=TTS_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def synthesize_shared(text: str, synthesize=synthesize_sentence):
+    """
+    synthesize(text), shared with any identical request already running.
+    """
+    return _tts_flight.do((synthesize.__name__, text), synthesize, text)
+
+
+# ===============================
+# Clip library
+# ===============================
+CLIP_DIR = OUTPUT_DIR / "clips"
+
+
+def clip_path(text: str, synthesize=synthesize_sentence):
+    # one folder per synthesizer so stub clips never mix with real ones
+    digest = hashlib.sha1(text.encode()).hexdigest()[:16]
+    return CLIP_DIR / synthesize.__name__ / f"{digest}.mp3"
+
+
+def load_clip(text: str, synthesize=synthesize_sentence):
+    """
+    Returns (mp3_bytes, synthesized) for a reusable phrase, synthesizing
+    and storing it only the first time it is needed.
+    """
+    path = clip_path(text, synthesize)
+    if path.exists():
+        return path.read_bytes(), False
+
+    audio = synthesize_shared(text, synthesize)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{uuid.uuid4().hex[:6]}.tmp")
+    tmp.write_bytes(audio)
+    tmp.replace(path)
+
+    return audio, True
+
+
+# pause between background clip syntheses, to stay clear of TTS rate limits
+CLIP_FILL_GAP_S = 0.5
+
+_fill_queue = queue.Queue()
+_fill_pending = set()
+_fill_lock = threading.Lock()
+_fill_thread = None
+
+
+def fill_clips_later(texts, synthesize=synthesize_sentence):
+    """
+    Queues clips to be synthesized one at a time on a background thread,
+    so a cold library fills up without bursts of TTS requests.
+    """
+    global _fill_thread
+
+    with _fill_lock:
+        for text in texts:
+            if (synthesize, text) not in _fill_pending:
+                _fill_pending.add((synthesize, text))
+                _fill_queue.put((synthesize, text))
+
+        if _fill_thread is None:
+            _fill_thread = threading.Thread(target=_fill_clips, daemon=True)
+            _fill_thread.start()
+
+
+def _fill_clips():
+    while True:
+        synthesize, text = _fill_queue.get()
+        try:
+            load_clip(text, synthesize)
+        except Exception as e:
+            print("Clip synthesis failed:", e)
+        finally:
+            with _fill_lock:
+                _fill_pending.discard((synthesize, text))
+        time.sleep(CLIP_FILL_GAP_S)
+
+
+def build_clip_library(synthesize=synthesize_sentence, vocabulary=None):
+    """
+    Pre-synthesizes every reusable narration phrase (ai_interpreter
+    .clip_vocabulary). Returns how many clips were newly created.
+    """
+    created = 0
+    for text in vocabulary or clip_vocabulary():
+        _, synthesized = load_clip(text, synthesize)
+        created += synthesized
+    return created
+
+
+class NarrationStream:
+    """
+    Synthesizes narration piece by piece on a background thread.
+
+    By default the text is split into sentences and each one goes to TTS.
+    With `segments` (see ai_interpreter.narration_segments) reusable pieces
+    come from the clip library and only the rest is synthesized live.
+    While the library is missing too many of them, the sentences are
+    synthesized instead and the missing clips are built in the background.
+
+    MP3 frames concatenate cleanly, so each piece is handed out as soon
+    as it is ready via chunks(), and the full file is written once the
+    last piece is done (result() returns its path).
+
+    Files are named after the text and synthesizer, so a narration that
+    was already assembled (e.g. by the warm-up scheduler) is served from
+    disk as a single chunk.
+    """
+
+    def __init__(self, text: str, synthesize=synthesize_sentence, segments=None):
+        sentences = [(sentence, False) for sentence in split_sentences(text)]
+        if segments is None:
+            segments = sentences
+
+        self.segments = segments
+        self.sentences = sentences
+        self.synthesize = synthesize
+        self.tts_calls = 0
+
+        file_id = hashlib.sha1(f"{synthesize.__name__}:{text}".encode()).hexdigest()[:12]
+        self.file_path = OUTPUT_DIR / f"sky_voice_{file_id}.mp3"
+        self.reused = self.file_path.exists()
+
+        self.error = None
+        self._chunks = queue.Queue()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        parts = []
+        try:
+            if self.reused:
+                self._chunks.put(self.file_path.read_bytes())
+                return
+
+            for text, reusable in self._plan():
+                if reusable:
+                    chunk, synthesized = load_clip(text, self.synthesize)
+                else:
+                    chunk, synthesized = synthesize_shared(text, self.synthesize), True
+
+                self.tts_calls += synthesized
+                parts.append(chunk)
+                self._chunks.put(chunk)
+
+            # atomic, since another stream may be reading the same file
+            tmp = self.file_path.with_suffix(f".{uuid.uuid4().hex[:6]}.tmp")
+            tmp.write_bytes(b"".join(parts))
+            tmp.replace(self.file_path)
+
+        except Exception as e:
+            print("Narration failed:", e)
+            self.error = e
+
+        finally:
+            self._chunks.put(None)
+            self._done.set()
+
+    def _plan(self):
+        """
+        The segments, unless assembling them would take more live TTS
+        calls than speaking the plain sentences (a cold clip library).
+        """
+        missing = [
+            text for text, reusable in self.segments
+            if reusable and not clip_path(text, self.synthesize).exists()
+        ]
+        live = len(missing) + sum(not reusable for _, reusable in self.segments)
+
+        if live <= len(self.sentences):
+            return self.segments
+
+        fill_clips_later(missing, self.synthesize)
+        return self.sentences
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def chunks(self, timeout=None):
+        """
+        Yields MP3 bytes per piece as they become available.
+        """
+        while True:
+            chunk = self._chunks.get(timeout=timeout)
+            if chunk is None:
+                return
+            yield chunk
+
+    def result(self, timeout=None):
+        """
+        Waits for the whole narration and returns the assembled file path.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("narration still in progress")
+        if self.error is not None:
+            raise self.error
+        return str(self.file_path)
+
+
+def narrate_snapshot(snapshot, location, synthesize=synthesize_sentence):
+    """
+    Describes a SkySnapshot and speaks it, assembling the audio from the
+    clip library so usually only the location (if any) needs TTS.
+
+    Returns (description_text, audio_file_path)
+    """
+    text = generate_sky_description(snapshot, location)
+    segments = narration_segments(snapshot, location)
+
+    return text, NarrationStream(text, synthesize, segments).result(NARRATION_TIMEOUT)
+
+
+if __name__ == "__main__":
+    print(f"Built {build_clip_library()} narration clips in {CLIP_DIR}")
@@ -0,0 +1,571 @@
+"""
+Standalone HTTP/JSON sky API.
+
+Serves the same compute core as the Streamlit app without any Streamlit
+reruns, so mobile clients and load tests can hit it directly:
+
+    python src/api.py --port 8000 --workers 4
+    python src/api.py --offline        # weather / geocoding / TTS stubs
+
+Endpoints (all GET; unless noted the query is lat, lon, date=YYYY-MM-DD,
+time=HH:MM and an optional location label):
+
+    /health          pool status
+    /stats           cache, warm-up and coalescing stats of the worker that answers
+    /geocode?city=   city name -> coordinates
+    /moon            phase, illumination, alt/az
+    /planets         planets above the horizon
+    /constellations  constellation stars above the horizon
+    /satellites      satellites above the horizon (needs a TLE file)
+    /passes          satellite passes over the next `hours` (default 12)
+    /narration       AI sky description text
+    /sky             everything above in one JSON document
+    /sky.json        compact position payload for client-side drawing
+    /image           rendered sky PNG (size=thumbnail|display|download or
+                     pixels per side, at most 2048)
+    /audio           narration MP3
+    /audio/stream    narration MP3 streamed sentence by sentence
+
+Heavy work runs on a pool of pre-warmed worker processes that each load
+the ephemeris once. When every worker is busy and the wait queue is full
+the API answers 503 straight away; a request that runs longer than the
+timeout answers 504, and its worker abandons it at the same deadline
+(where SIGALRM exists) so a stuck call can't hold a worker for good.
+Streamed narrations run on the HTTP threads, at most `streams` at once.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from datetime import date as dt_date, time as dt_time, datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+
+# ======================================================
+# Worker side
+# ======================================================
+def _init_worker(offline, warmup=False):
+    """
+    Runs once per worker process: picks a headless matplotlib backend
+    and imports the compute modules, which loads the ephemeris.
+    With `warmup`, each worker also warms its own caches in the background.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import pipeline
+
+    if offline:
+        pipeline.use_offline_stubs()
+
+    if warmup:
+        from warmup import start_warmup
+        start_warmup()
+
+
+def _ping():
+    return True
+
+
+class TaskDeadline(BaseException):
+    """
+    Raised into a task that runs past its deadline. A BaseException, like
+    KeyboardInterrupt, so `except Exception` blocks in the task can't
+    swallow it.
+    """
+
+
+def _deadline_exceeded(signum, frame):
+    raise TaskDeadline()
+
+
+def _call_task(fn, params, deadline=None):
+    """
+    Runs a task in the worker, interrupting it after `deadline` seconds
+    where the platform has SIGALRM (worker tasks run on the main thread).
+
+    Exceptions leave as plain ValueError (-> 400) or RuntimeError (-> 500)
+    with the original message, since library exceptions often can't be
+    pickled back to the server.
+    """
+    timed = deadline is not None and hasattr(signal, "setitimer")
+    if timed:
+        signal.signal(signal.SIGALRM, _deadline_exceeded)
+        signal.setitimer(signal.ITIMER_REAL, deadline)
+
+    try:
+        return fn(params)
+    except TaskDeadline:
+        raise RuntimeError(f"abandoned after {deadline:g} s") from None
+    except ValueError as e:
+        raise ValueError(str(e)) from None
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _snapshot(params):
+    from snapshot import compute_snapshot
+    return compute_snapshot(params["date"], params["time"], params["lat"], params["lon"])
+
+
+def task_stats(params):
+    import os
+    import pipeline
+    import singleflight
+    from snapshot import compute_sky
+
+    warm = pipeline.warm_scheduler
+    return {
+        "pid": os.getpid(),
+        "sky_memo": compute_sky.stats(),
+        "single_flight": singleflight.stats(),
+        "warmup": warm.stats() if warm is not None else None,
+    }
+
+
+def task_moon(params):
+    moon = _snapshot(params).moon_dict()
+    moon["datetime_utc"] = moon["datetime_utc"].isoformat()
+    return moon
+
+
+def task_planets(params):
+    return [
+        {"name": name, "altitude": round(alt, 2), "azimuth": round(az, 2)}
+        for name, alt, az in _snapshot(params).planets
+        if alt > 0
+    ]
+
+
+def task_constellations(params):
+    return {
+        name: [
+            {"star": star, "altitude": round(alt, 2), "azimuth": round(az, 2)}
+            for star, alt, az in pts
+        ]
+        for name, pts in _snapshot(params).constellation_geometry().items()
+    }
+
+
+def task_satellites(params):
+    import pipeline
+
+    sats = pipeline.satellites_for(_snapshot(params))
+    if sats is None:
+        return None
+    return [
+        {"name": str(name), "altitude": round(float(alt), 2),
+         "azimuth": round(float(az), 2), "naked_eye": bool(lit)}
+        for name, alt, az, lit in zip(sats.names, sats.alt, sats.az, sats.naked_eye)
+    ]
+
+
+def task_passes(params):
+    import pipeline
+
+    passes = pipeline.satellite_passes(
+        params["date"], params["time"], params["lat"], params["lon"],
+        hours=params["hours"], visible_only=params["visible_only"],
+    )
+    if passes is None:
+        return None
+    for p in passes:
+        for k in ("rise", "culmination", "set"):
+            p[k] = p[k].isoformat()
+    return passes
+
+
+def task_sky(params, output="png"):
+    import pipeline
+    from sky_generator import render_px
+
+    render_px(params["size"])   # ValueError (-> 400) for an unknown size
+
+    result = pipeline.generate_sky(
+        params["location"], params["date"], params["time"],
+        params["lat"], params["lon"],
+        with_voice=False,
+        output=output,
+        image_sizes=(params["size"],),
+        with_satellites=params["satellites"],
+    )
+    result["moon"]["datetime_utc"] = result["moon"]["datetime_utc"].isoformat()
+    result["snapshot"] = result["snapshot"].to_dict()
+    return result
+
+
+def task_payload(params):
+    return task_sky(params, output="vector")["sky_payload"]
+
+
+def task_narration(params):
+    import pipeline
+    from ai_interpreter import narration_segments
+
+    result = pipeline.generate_sky(
+        params["location"], params["date"], params["time"],
+        params["lat"], params["lon"],
+        with_voice=False,
+        output=None,
+    )
+    return {
+        "text": result["summary"],
+        "segments": narration_segments(result["snapshot"], params["location"]),
+    }
+
+
+def task_geocode(params):
+    import pipeline
+
+    return pipeline.lookup_city_coordinates(params["city"])
+
+
+def task_image(params):
+    return Path(task_sky(params)["image_paths"][params["size"]]).read_bytes()
+
+
+def task_audio(params):
+    import pipeline
+
+    result = pipeline.generate_sky(
+        params["location"], params["date"], params["time"],
+        params["lat"], params["lon"],
+        output=None,
+    )
+    return Path(result["voice_path"]).read_bytes()
+
+
+# ======================================================
+# Worker pool with backpressure
+# ======================================================
+class PoolBusy(Exception):
+    pass
+
+
+# workers give a task this much longer than the server waits for it,
+# so the client always gets the 504 rather than the worker's error
+ABANDON_GRACE_S = 1.0
+
+
+class WorkerPool:
+
+    def __init__(self, workers=2, queue_size=8, timeout=30.0, offline=False, warmup=False):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(offline, warmup),
+        )
+        # running + waiting requests admitted at once
+        self.capacity = workers + queue_size
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """
+        Starts every worker (and so loads every ephemeris) up front.
+        """
+        futures = [self.executor.submit(_ping) for _ in range(self.workers)]
+        for f in futures:
+            f.result()
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+        self.slots.release()
+
+    def run(self, fn, params):
+        if not self.slots.acquire(blocking=False):
+            raise PoolBusy()
+
+        with self._lock:
+            self.in_flight += 1
+
+        try:
+            future = self.executor.submit(_call_task, fn, params,
+                                          self.timeout + ABANDON_GRACE_S)
+        except Exception:
+            self._release(None)
+            raise
+
+        # the slot is only freed once the worker is actually done, so
+        # timed-out work still counts against capacity until the worker
+        # gives it up too (ABANDON_GRACE_S later)
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+# ======================================================
+# HTTP side
+# ======================================================
+JSON_ROUTES = {
+    "/moon": task_moon,
+    "/planets": task_planets,
+    "/constellations": task_constellations,
+    "/satellites": task_satellites,
+    "/passes": task_passes,
+    "/narration": task_narration,
+    "/sky": task_sky,
+    "/sky.json": task_payload,
+}
+
+BINARY_ROUTES = {
+    "/image": (task_image, "image/png"),
+    "/audio": (task_audio, "audio/mpeg"),
+}
+
+
+def parse_params(path, query):
+    q = {k: v[0] for k, v in parse_qs(query).items()}
+
+    if path == "/stats":
+        return {}
+
+    if path == "/geocode":
+        if not q.get("city"):
+            raise ValueError("city is required")
+        return {"city": q["city"]}
+
+    if "lat" not in q or "lon" not in q:
+        raise ValueError("lat and lon are required")
+
+    lat = float(q["lat"])
+    lon = float(q["lon"])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat/lon out of range")
+
+    date = dt_date.fromisoformat(q["date"]) if "date" in q else dt_date.today()
+    time = dt_time.fromisoformat(q["time"]) if "time" in q else dt_time(21, 0)
+
+    hours = float(q.get("hours", 12))
+    if not 0 < hours <= 48:
+        raise ValueError("hours must be between 0 and 48")
+
+    return {
+        "lat": lat,
+        "lon": lon,
+        "date": date,
+        "time": time,
+        "location": q.get("location", "Custom Location"),
+        "size": q.get("size", "display"),
+        "satellites": q.get("satellites", "0") in ("1", "true", "yes"),
+        "hours": hours,
+        "visible_only": q.get("visible_only", "1") in ("1", "true", "yes"),
+    }
+
+
+class SkyRequestHandler(BaseHTTPRequestHandler):
+
+    pool = None
+    synthesize = None
+    stream_slots = None
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self._send(status, body, "application/json")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "workers": self.pool.workers,
+                "in_flight": self.pool.in_flight,
+                "capacity": self.pool.capacity,
+            })
+            return
+
+        if url.path == "/stats":
+            fn, content_type = task_stats, None
+        elif url.path == "/audio/stream":
+            fn, content_type = task_narration, "audio/mpeg"
+        elif url.path == "/geocode":
+            fn, content_type = task_geocode, None
+        elif url.path in JSON_ROUTES:
+            fn, content_type = JSON_ROUTES[url.path], None
+        elif url.path in BINARY_ROUTES:
+            fn, content_type = BINARY_ROUTES[url.path]
+        else:
+            self._send_json(404, {"error": "unknown endpoint"})
+            return
+
+        try:
+            params = parse_params(url.path, url.query)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        # streamed TTS runs on this thread, outside the pool's capacity
+        streaming = url.path == "/audio/stream"
+        if streaming and not self.stream_slots.acquire(blocking=False):
+            self._send_busy()
+            return
+
+        try:
+            self._answer(url, fn, content_type, params)
+        finally:
+            if streaming:
+                self.stream_slots.release()
+
+    def _send_busy(self):
+        self.send_response(503)
+        self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _answer(self, url, fn, content_type, params):
+        try:
+            result = self.pool.run(fn, params)
+        except PoolBusy:
+            self._send_busy()
+            return
+        except FutureTimeout:
+            self._send_json(504, {"error": "timed out"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        if url.path == "/audio/stream":
+            self._stream_narration(result["text"], result["segments"])
+            return
+
+        if content_type is None:
+            if result is None:
+                self._send_json(404, {"error": "not found"})
+            else:
+                self._send_json(200, result)
+        else:
+            self._send(200, result, content_type)
+
+
+    def _stream_narration(self, text, segments):
+        """
+        TTS is network-bound, so it runs here on the request thread rather
+        than on a compute worker. Each piece is written out as soon as it is
+        ready (clip library or live TTS); the response ends when the
+        connection closes.
+
+        A narration that can't start within the pool timeout answers 504;
+        one that stalls later just ends early, since the 200 is already out.
+        """
+        from ai_voice import NarrationStream
+
+        narration = NarrationStream(text, synthesize=self.synthesize, segments=segments)
+        chunks = narration.chunks(timeout=self.pool.timeout)
+
+        try:
+            first = next(chunks, None)
+        except queue.Empty:
+            self._send_json(504, {"error": "timed out"})
+            return
+
+        if first is None:
+            self._send_json(500, {"error": str(narration.error or "no audio")})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        sent = 0
+        try:
+            for chunk in itertools.chain([first], chunks):
+                self.wfile.write(chunk)
+                self.wfile.flush()
+                sent += len(chunk)
+        except queue.Empty:
+            self.log_error("narration stream stalled after %d bytes", sent)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def make_server(host="127.0.0.1", port=8000, workers=2, queue_size=8,
+                timeout=30.0, offline=False, warmup=False, streams=8):
+    pool = WorkerPool(workers, queue_size, timeout, offline, warmup)
+    pool.warm()
+
+    # /audio/stream synthesizes here; same backend as /audio in the workers
+    import pipeline
+
+    if offline:
+        pipeline.use_offline_stubs()
+
+    handler = type("Handler", (SkyRequestHandler,), {
+        "pool": pool,
+        "synthesize": staticmethod(pipeline.synthesize_sentence),
+        "stream_slots": threading.BoundedSemaphore(streams),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.pool = pool
+
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Astro Time Machine HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=8,
+                        help="requests allowed to wait for a worker before 503")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="per-request timeout in seconds")
+    parser.add_argument("--offline", action="store_true",
+                        help="use local stubs for weather, geocoding and TTS")
+    parser.add_argument("--streams", type=int, default=8,
+                        help="/audio/stream responses allowed at once before 503")
+    parser.add_argument("--warmup", action="store_true",
+                        help="precompute preset cities / upcoming hours in each worker")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.queue,
+                         args.timeout, args.offline, args.warmup, args.streams)
+
+    print(f"Sky API on http://{args.host}:{args.port} "
+          f"({args.workers} workers, {datetime.now():%H:%M:%S})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,17 @@
 import streamlit as st
-from datetime import time as dt_time, date as dt_date
-from moon import get_moon_data
-from weather import get_cloud_cover, is_moon_hidden_by_clouds
-from sky_generator import generate_sky_image
+from datetime import datetime, time as dt_time, date as dt_date
+from pipeline import generate_sky, start_voice_narration
+from satellites import current_catalog
+from warmup import start_warmup
+from snapshot import EPHEMERIS_RANGE
+from sky_canvas import sky_canvas_html
 import base64
-from ai_interpreter import generate_sky_description
-from ai_voice import generate_voice_narration
+from geo import lookup_city_coordinates, get_user_location, PRESET_CITIES
 import re
-import requests
-from geopy.geocoders import Nominatim
+import uuid
 import streamlit.components.v1 as components
 
 
-# ===============================
-# Geocoder (City Search)
-# ===============================
-geolocator = Nominatim(user_agent="astro_time_machine_app")
-
-def lookup_city_coordinates(city_name: str):
-    try:
-        location = geolocator.geocode(city_name)
-        if location:
-            return {
-                "city": location.address.split(",")[0],
-                "lat": location.latitude,
-                "lon": location.longitude
-            }
-    except:
-        pass
-    return None
-
-
-# ===============================
-# Safe IP Location Detection
-# ===============================
-def get_user_location():
-    try:
-        r = requests.get("https://ipapi.co/json/", timeout=5)
-        if r.status_code == 200:
-            d = r.json()
-            lat = d.get("latitude")
-            lon = d.get("longitude")
-            if lat and lon:
-                return {
-                    "city": d.get("city", "Unknown"),
-                    "lat": lat,
-                    "lon": lon,
-                }
-    except:
-        pass
-    return None
-
-
 # ===============================
 # Browser GPS Detection
 # ===============================
@@ -190,16 +150,34 @@ div.block-container {
 """, unsafe_allow_html=True)
 
 
+# ===============================
+# Background cache warm-up (one per server process)
+# ===============================
+# the "Draw sky in the browser" toggle's default; warm what it will ask for
+DRAW_IN_BROWSER = True
+
+@st.cache_resource
+def warm_cache():
+    return start_warmup(output="vector" if DRAW_IN_BROWSER else "png")
+
+warm_cache()
+
+
 # ===============================
 # Session Defaults
 # ===============================
 if "current_sky_image" not in st.session_state:
     st.session_state.current_sky_image = None
+    st.session_state.sky_payload = None
     st.session_state.visible_planets = []
+    st.session_state.satellites = None
     st.session_state.moon_status_text = "—"
     st.session_state.moon_phase_label = "—"
     st.session_state.ai_summary = "Generate a sky view to see AI narration."
     st.session_state.voice_path = None
+    st.session_state.narration = None
+    st.session_state.refinement = None
+    st.session_state.session_id = uuid.uuid4().hex
 
 
 # ===============================
@@ -280,14 +258,8 @@ with col_controls:
 
         # Preset cities
         if location_mode == "Select a city":
-            location = st.selectbox("City", ["Bangalore", "New York", "London"])
-
-            if location == "Bangalore":
-                latitude, longitude = 12.97, 77.59
-            elif location == "New York":
-                latitude, longitude = 40.71, -74.00
-            else:
-                latitude, longitude = 51.50, -0.12
+            location = st.selectbox("City", list(PRESET_CITIES))
+            latitude, longitude = PRESET_CITIES[location]
 
         # City search (no coordinates needed)
         elif location_mode == "Search a city":
@@ -315,16 +287,27 @@ with col_controls:
     c1, c2 = st.columns(2)
 
     with c1:
+        first_date = max(dt_date(1900, 1, 1), EPHEMERIS_RANGE[0])
+        last_date = min(dt_date(2100, 12, 31), EPHEMERIS_RANGE[1])
+
         selected_date = st.date_input(
             "Date",
-            dt_date.today(),
-            min_value=dt_date(1900, 1, 1),
-            max_value=dt_date(2100, 12, 31)
+            min(max(dt_date.today(), first_date), last_date),
+            min_value=first_date,
+            max_value=last_date
         )
 
     with c2:
         selected_time = st.time_input("Time", dt_time(21, 0))
 
+    vector_sky = st.toggle("⚡ Draw sky in the browser", value=DRAW_IN_BROWSER)
+
+    # only offered when an installed TLE file covers the chosen instant
+    # (see satellites.py)
+    show_satellites = False
+    if current_catalog(datetime.combine(selected_date, selected_time)) is not None:
+        show_satellites = st.toggle("🛰 Show satellites")
+
     generate = st.button("🚀 Generate sky")
 
     st.markdown("</div>", unsafe_allow_html=True)
@@ -333,6 +316,16 @@ with col_controls:
 # ======================================================
 # 🌌 CENTER — SKY DISPLAY
 # ======================================================
+def show_sky_image(slot, path):
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode()
+
+    slot.markdown(f"""
+    <div class="sky-circle">
+        <img src="data:image/png;base64,{encoded}">
+    </div>
+    """, unsafe_allow_html=True)
+
 with col_sky:
 
     st.markdown('<div class="card" style="display:flex;justify-content:center;">',
@@ -342,70 +335,40 @@ with col_sky:
 
         with st.spinner("Computing celestial positions…"):
 
-            moon = get_moon_data(
-                date=selected_date,
-                time=selected_time,
-                latitude=latitude,
-                longitude=longitude,
-            )
-
-            st.session_state.moon_phase_label = moon["phase_name"]
-            moon_alt = moon["altitude"]
-            moon_az = moon["azimuth"]
-            moon_brightness = moon["illumination"]
-
-            cloud_cover = get_cloud_cover(latitude, longitude)
-
-            moon_cloud_hidden = is_moon_hidden_by_clouds(
-                cloud_cover=cloud_cover,
-                moon_altitude=moon_alt,
-            )
-
-            if moon_alt < 0:
-                st.session_state.moon_status_text = "Below horizon"
-            elif moon_cloud_hidden:
-                st.session_state.moon_status_text = "Cloud obscured"
-            else:
-                st.session_state.moon_status_text = "Visible"
-
-            image_path, st.session_state.visible_planets = generate_sky_image(
+            result = generate_sky(
+                location=location,
                 date=selected_date,
                 time=selected_time,
                 latitude=latitude,
                 longitude=longitude,
-                cloud_cover=cloud_cover,
-                moon_phase=moon_brightness / 100,
-                moon_altitude=moon_alt,
-                moon_azimuth=moon_az,
-            )
-
-            st.session_state.current_sky_image = str(image_path)
-
-            st.session_state.ai_summary = generate_sky_description(
-                location=location,
-                date=selected_date,
-                time=selected_time,
-                moon_phase=moon["phase_name"],
-                moon_visibility=st.session_state.moon_status_text,
-                moon_brightness=moon["illumination"],
-                visible_planets=st.session_state.visible_planets,
-                cloud_cover=cloud_cover,
+                with_voice=False,
+                output="vector" if vector_sky else "progressive",
+                with_satellites=show_satellites,
+                session=st.session_state.session_id,
             )
 
-            st.session_state.voice_path = generate_voice_narration(
-                st.session_state.ai_summary
+            st.session_state.moon_phase_label = result["moon"]["phase_name"]
+            st.session_state.moon_status_text = result["moon_status"]
+            st.session_state.visible_planets = result["visible_planets"]
+            st.session_state.satellites = result["satellites"]
+            st.session_state.current_sky_image = result["image_path"]
+            st.session_state.refinement = result["refinement"]
+            st.session_state.sky_payload = result["sky_payload"]
+            st.session_state.ai_summary = result["summary"]
+            st.session_state.voice_path = None
+
+            # TTS runs in the background; the image and text show right away
+            st.session_state.narration = start_voice_narration(
+                result["summary"], result["snapshot"], location
             )
 
-    # render sky image
-    if st.session_state.current_sky_image:
-        with open(st.session_state.current_sky_image, "rb") as f:
-            encoded = base64.b64encode(f.read()).decode()
+    # render sky image (a preview first when the full render is pending)
+    sky_slot = st.empty()
 
-        st.markdown(f"""
-        <div class="sky-circle">
-            <img src="data:image/png;base64,{encoded}">
-        </div>
-        """, unsafe_allow_html=True)
+    if st.session_state.sky_payload:
+        components.html(sky_canvas_html(st.session_state.sky_payload), height=450)
+    elif st.session_state.current_sky_image:
+        show_sky_image(sky_slot, st.session_state.current_sky_image)
     else:
         st.markdown("""
         <div class="sky-circle">
@@ -438,6 +401,10 @@ with col_info:
     info_tile("🌙", "Moon phase", st.session_state.moon_phase_label)
     info_tile("👁️", "Visibility", st.session_state.moon_status_text)
     info_tile("🪐", "Planets", planet_list)
+    if st.session_state.satellites is not None:
+        naked_eye = sum(s["naked_eye"] for s in st.session_state.satellites)
+        info_tile("🛰", "Satellites",
+                  f"{len(st.session_state.satellites)} up, {naked_eye} naked-eye")
     info_tile("📍", "Location", location)
 
 
@@ -470,7 +437,42 @@ st.markdown(safe_ai_text, unsafe_allow_html=True)
 st.markdown("</div></div>", unsafe_allow_html=True)
 
 
+# 🖼 FULL-QUALITY SKY (swaps out the preview once rendered)
+refinement = st.session_state.refinement
+
+if refinement is not None:
+    try:
+        paths = refinement.result(timeout=60)
+        st.session_state.current_sky_image = str(paths["display"])
+        show_sky_image(sky_slot, st.session_state.current_sky_image)
+    except Exception:
+        pass   # superseded by a newer request, or failed: keep the preview
+
+    st.session_state.refinement = None
+
+
 # 🎧 AUDIO PLAYER
+narration = st.session_state.narration
+
+if narration is not None and st.session_state.voice_path is None:
+    progress = st.progress(0.0, text="🎧 Preparing narration…")
+    total = max(1, len(narration.segments))
+
+    try:
+        for i, _ in enumerate(narration.chunks(timeout=60), start=1):
+            progress.progress(min(i / total, 1.0), text="🎧 Preparing narration…")
+    except Exception:
+        pass
+
+    progress.empty()
+
+    try:
+        st.session_state.voice_path = narration.result(timeout=5)
+    except Exception:
+        st.caption("Voice narration is unavailable right now.")
+
+    st.session_state.narration = None
+
 if st.session_state.voice_path:
     with open(st.session_state.voice_path, "rb") as f:
         st.audio(f.read(), format="audio/mp3")
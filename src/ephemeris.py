@@ -0,0 +1,219 @@
+"""
+Ephemeris loading and excerpt building.
+
+The app only needs the Sun, Moon, Earth and four planet barycenters for
+the years the date picker offers (1900–2100). de421.bsp stops in 2053
+and carries bodies we never draw, so the preferred kernel is an excerpt
+of a longer one (DE440) cut down to exactly those bodies and years:
+
+    python src/ephemeris.py build de440.bsp
+    python src/ephemeris.py validate de440.bsp assets/ephemeris/de440_1900_2100.bsp
+
+Loading order: ASTRO_EPHEMERIS if set, else the excerpt if it has been
+built, else de421.bsp (downloaded by Skyfield on first use).
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+
+EXCERPT_FILE = Path("assets/ephemeris") / f"de440_{FIRST_YEAR}_{LAST_YEAR}.bsp"
+FALLBACK_FILE = "de421.bsp"
+
+# NAIF ids of the segments snapshot.py reads. Planets are barycenters so
+# the same names work with DE440, which has no planet-center segments.
+TARGETS = {
+    2: "venus barycenter",
+    3: "earth barycenter",
+    4: "mars barycenter",
+    5: "jupiter barycenter",
+    6: "saturn barycenter",
+    10: "sun",
+    301: "moon",
+    399: "earth",
+}
+
+# padding so light-time corrections at the range edges stay inside it
+MARGIN_DAYS = 2
+
+# The excerpt keeps the source coefficients but re-bases each segment's
+# start time, which moves results by float round-off (~1 cm at 1e8 km).
+# One metre is still a thousand times below an arcsecond at the Moon.
+VALIDATE_TOLERANCE_KM = 1e-3
+
+
+def ephemeris_path():
+    env = os.environ.get("ASTRO_EPHEMERIS")
+    if env:
+        return env
+    if EXCERPT_FILE.exists():
+        return str(EXCERPT_FILE)
+    return FALLBACK_FILE
+
+
+def load_ephemeris(path=None):
+    """
+    Skyfield kernel for `path` (default ephemeris_path()). Files that
+    exist are opened in place; a bare name like de421.bsp goes through
+    Skyfield's downloader.
+    """
+    from skyfield.api import load, load_file
+
+    path = path or ephemeris_path()
+    if Path(path).exists():
+        return load_file(path)
+    return load(path)
+
+
+def coverage(kernel):
+    """
+    (first, last) calendar dates every segment of a loaded Skyfield
+    kernel covers, i.e. the dates snapshots can be computed for.
+    """
+    from datetime import date
+    from jplephem.calendar import compute_calendar_date
+
+    segments = kernel.spk.segments
+    start = max(s.start_jd for s in segments)
+    end = min(s.end_jd for s in segments)
+
+    # whole days strictly inside the range
+    return (
+        date(*compute_calendar_date(int(start + 0.5) + 1)),
+        date(*compute_calendar_date(int(end + 0.5) - 1)),
+    )
+
+
+# ==========================
+# Excerpt builder
+# ==========================
+def _year_jd(year):
+    from jplephem.calendar import compute_julian_date
+    return compute_julian_date(year, 1, 1)
+
+
+def build_excerpt(source, output=EXCERPT_FILE, first_year=FIRST_YEAR,
+                  last_year=LAST_YEAR, targets=TARGETS):
+    """
+    Writes the segments of `source` for `targets` over first_year ..
+    last_year (inclusive) to `output`, via jplephem's excerpter.
+    Returns the output path.
+    """
+    from jplephem.spk import SPK
+    from jplephem.excerpter import write_excerpt
+
+    start_jd = _year_jd(first_year) - MARGIN_DAYS
+    end_jd = _year_jd(last_year + 1) + MARGIN_DAYS
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    spk = SPK.open(source)
+    try:
+        summaries = [
+            summary
+            for summary, segment in zip(spk.daf.summaries(), spk.segments)
+            if segment.target in targets
+        ]
+
+        missing = set(targets) - {s.target for s in spk.segments}
+        if missing:
+            raise ValueError(f"{source} has no segments for NAIF ids {sorted(missing)}")
+
+        for segment in spk.segments:
+            if segment.target in targets and not (
+                segment.start_jd <= start_jd and segment.end_jd >= end_jd
+            ):
+                raise ValueError(f"{source} does not cover {first_year}–{last_year}: {segment}")
+
+        tmp = output.with_name(f".{output.name}.tmp")
+        with open(tmp, "w+b") as f:
+            write_excerpt(spk, f, start_jd, end_jd, summaries)
+        tmp.replace(output)
+
+    finally:
+        spk.close()
+
+    return output
+
+
+def validate_excerpt(source, excerpt, samples=20000, seed=0):
+    """
+    Evaluates every excerpt segment and its source segment at `samples`
+    random instants inside the excerpt (plus both ends).
+
+    Returns {(center, target): max position difference in km}.
+    """
+    from jplephem.spk import SPK
+
+    src, exc = SPK.open(source), SPK.open(excerpt)
+    try:
+        rng = np.random.default_rng(seed)
+        diffs = {}
+
+        for segment in exc.segments:
+            reference = src[segment.center, segment.target]
+
+            tdb = rng.uniform(segment.start_jd, segment.end_jd, samples)
+            tdb = np.concatenate([[segment.start_jd, segment.end_jd], tdb])
+
+            delta = segment.compute(tdb) - reference.compute(tdb)
+            diffs[segment.center, segment.target] = float(np.abs(delta).max())
+
+        return diffs
+
+    finally:
+        src.close()
+        exc.close()
+
+
+# ==========================
+# CLI
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the app's ephemeris excerpt")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="cut an excerpt out of a larger SPK kernel")
+    p.add_argument("source", help="e.g. de440.bsp")
+    p.add_argument("-o", "--output", default=str(EXCERPT_FILE))
+    p.add_argument("--first-year", type=int, default=FIRST_YEAR)
+    p.add_argument("--last-year", type=int, default=LAST_YEAR)
+
+    p = sub.add_parser("validate", help="compare an excerpt with its source")
+    p.add_argument("source")
+    p.add_argument("excerpt", nargs="?", default=str(EXCERPT_FILE))
+    p.add_argument("--samples", type=int, default=20000)
+    p.add_argument("--tolerance-km", type=float, default=VALIDATE_TOLERANCE_KM)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        output = build_excerpt(args.source, args.output, args.first_year, args.last_year)
+        size = Path(args.source).stat().st_size, output.stat().st_size
+        print(f"Wrote {output} ({size[1] / 1e6:.1f} MB, source {size[0] / 1e6:.1f} MB)")
+        args.excerpt, args.samples, args.tolerance_km = output, 2000, VALIDATE_TOLERANCE_KM
+
+    diffs = validate_excerpt(args.source, args.excerpt, args.samples)
+    worst = max(diffs.values())
+
+    for (center, target), diff in sorted(diffs.items()):
+        print(f"  {center:>3} -> {target:<3} {TARGETS.get(target, ''):<20} max |Δ| {diff:.3g} km")
+
+    if worst > args.tolerance_km:
+        print(f"Excerpt differs from source by up to {worst:.3g} km")
+        return 1
+
+    print("Excerpt matches source")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import os
+import requests
+from geopy.geocoders import Nominatim
+
+from singleflight import SingleFlight
+
+
+# Overridable so load tests can point at local stand-ins
+IPAPI_URL = os.environ.get("ASTRO_IPAPI_URL", "https://ipapi.co/json/")
+NOMINATIM_DOMAIN = os.environ.get("ASTRO_NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.environ.get("ASTRO_NOMINATIM_SCHEME", "https")
+
+# Cities offered in the "Select a city" picker
+PRESET_CITIES = {
+    "Bangalore": (12.97, 77.59),
+    "New York": (40.71, -74.00),
+    "London": (51.50, -0.12),
+}
+
+
+# ===============================
+# Geocoder (City Search)
+# ===============================
+geolocator = Nominatim(
+    user_agent="astro_time_machine_app",
+    domain=NOMINATIM_DOMAIN,
+    scheme=NOMINATIM_SCHEME,
+)
+
+# Nominatim allows one request per second, so identical lookups that
+# arrive together (a trending city) share one request
+_geocode_flight = SingleFlight("geocode", timeout=15)
+
+
+def lookup_city_coordinates(city_name: str):
+    key = " ".join(city_name.split()).lower()
+    try:
+        location = _geocode_flight.do(key, geolocator.geocode, city_name)
+        if location:
+            return {
+                "city": location.address.split(",")[0],
+                "lat": location.latitude,
+                "lon": location.longitude
+            }
+    except:
+        pass
+    return None
+
+
+# ===============================
+# Safe IP Location Detection
+# ===============================
+def get_user_location():
+    try:
+        r = requests.get(IPAPI_URL, timeout=5)
+        if r.status_code == 200:
+            d = r.json()
+            lat = d.get("latitude")
+            lon = d.get("longitude")
+            if lat and lon:
+                return {
+                    "city": d.get("city", "Unknown"),
+                    "lat": lat,
+                    "lon": lon,
+                }
+    except:
+        pass
+    return None
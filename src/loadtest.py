@@ -0,0 +1,424 @@
+"""
+Offline load-test harness.
+
+Starts local stand-ins for Open-Meteo, Nominatim, ipapi and the TTS
+service (each with configurable latency and error rate), points the app
+modules at them, then drives concurrent simulated sessions through the
+full "Generate sky" pipeline on a pool of worker processes:
+
+    python src/loadtest.py --workers 4 --sessions 40 --requests 5
+    python src/loadtest.py --latency 120 --error-rate 0.02 \\
+        --service tts=400:0.05 --json report.json
+
+Reports throughput, p50/p95/p99 latency and peak memory per worker.
+Nothing leaves the machine (the ephemeris file must already be local).
+
+Images and narration audio are named after their inputs and reused from
+disk, so each worker runs in a fresh temporary directory and every run
+starts cold. --cache-dir runs in (and keeps) a given directory instead,
+to measure a warm disk cache on repeated runs.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time as time_mod
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as dt_date, datetime, time as dt_time, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from stubs import SILENT_MP3_FRAME, STUB_CITIES
+
+
+# ======================================================
+# Stand-in services
+# ======================================================
+class StandIn:
+    """
+    One fake upstream on a local port. `respond(path, query)` returns
+    (content_type, body_bytes); latency and errors are injected around it.
+    """
+
+    def __init__(self, name, respond, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0):
+        self.name = name
+        self.respond = respond
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.served = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(name)
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                standin._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, request):
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+
+        time_mod.sleep(delay)
+
+        url = urlparse(request.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if fail:
+            status, content_type, body = 503, "text/plain", b"injected failure"
+        else:
+            status = 200
+            content_type, body = self.respond(url.path, query)
+
+        with self._lock:
+            self.served += 1
+            self.failed += fail
+
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def _json(payload):
+    return "application/json", json.dumps(payload).encode()
+
+
+def respond_open_meteo(path, query):
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+    hours = [start + timedelta(hours=h) for h in range(24 * 8)]
+    return _json({
+        "hourly": {
+            "time": [h.strftime("%Y-%m-%dT%H:00") for h in hours],
+            "cloudcover": [(h.hour * 7) % 101 for h in hours],
+        }
+    })
+
+
+def respond_nominatim(path, query):
+    name = query.get("q", "").strip()
+    coords = STUB_CITIES.get(name.lower())
+    if coords is None:
+        return _json([])
+    return _json([{
+        "place_id": 1,
+        "lat": str(coords[0]),
+        "lon": str(coords[1]),
+        "display_name": f"{name.title()}, Stand-in Country",
+    }])
+
+
+def respond_ipapi(path, query):
+    return _json({"city": "London", "latitude": 51.50, "longitude": -0.12})
+
+
+def respond_tts(path, query):
+    text = query.get("q", "")
+    return "audio/mpeg", SILENT_MP3_FRAME * max(1, len(text) // 40)
+
+
+SERVICES = {
+    "weather": respond_open_meteo,
+    "geocode": respond_nominatim,
+    "ipapi": respond_ipapi,
+    "tts": respond_tts,
+}
+
+
+def service_env(standins):
+    """
+    Environment that points weather.py, geo.py and ai_voice.py at the
+    stand-ins. Must be in place before those modules are imported.
+    """
+    return {
+        "ASTRO_OPEN_METEO_URL": standins["weather"].url + "/v1/forecast",
+        "ASTRO_NOMINATIM_DOMAIN": standins["geocode"].url.split("://")[1],
+        "ASTRO_NOMINATIM_SCHEME": "http",
+        "ASTRO_IPAPI_URL": standins["ipapi"].url + "/json/",
+        "ASTRO_TTS_URL": standins["tts"].url + "/translate_tts",
+    }
+
+
+# ======================================================
+# Simulated sessions (worker side)
+# ======================================================
+SESSION_TIMES = [dt_time(h, 0) for h in (20, 21, 21, 21, 22, 23)]
+
+
+def _run_worker(worker_id, sessions, requests_per_session, think_time, seed, env,
+                cache_dir=None):
+    os.environ.update(env)
+
+    # outputs land relative to the working directory (assets/...)
+    workdir = cache_dir or tempfile.mkdtemp(prefix=f"astro-loadtest-{worker_id}-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    try:
+        return _run_sessions(worker_id, sessions, requests_per_session, think_time, seed)
+    finally:
+        if cache_dir is None:
+            os.chdir(tempfile.gettempdir())
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_sessions(worker_id, sessions, requests_per_session, think_time, seed):
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import geo
+    import pipeline
+
+    latencies = []
+    errors = []
+    fallbacks = 0
+    lock = threading.Lock()
+
+    def session(index):
+        nonlocal fallbacks
+        rng = random.Random(seed * 1000 + index)
+        cities = list(STUB_CITIES)
+
+        for _ in range(requests_per_session):
+            started = time_mod.perf_counter()
+            try:
+                # what a user does before clicking "Generate sky"
+                if rng.random() < 0.3:
+                    place = geo.get_user_location()
+                else:
+                    place = pipeline.lookup_city_coordinates(rng.choice(cities))
+
+                if place is None:
+                    with lock:
+                        fallbacks += 1
+                    place = {"city": "Bangalore", "lat": 12.97, "lon": 77.59}
+
+                pipeline.generate_sky(
+                    location=place["city"],
+                    date=dt_date.today() + timedelta(days=rng.randint(-1, 1)),
+                    time=rng.choice(SESSION_TIMES),
+                    latitude=place["lat"],
+                    longitude=place["lon"],
+                )
+
+                elapsed = time_mod.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+
+            time_mod.sleep(rng.uniform(0, think_time))
+
+    threads = [
+        threading.Thread(target=session, args=(i,), daemon=True)
+        for i in range(sessions)
+    ]
+
+    # timed after imports so ephemeris loading is not counted as load
+    started = time_mod.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    finished = time_mod.time()
+
+    return {
+        "worker": worker_id,
+        "pid": os.getpid(),
+        "sessions": sessions,
+        "latencies": latencies,
+        "errors": errors,
+        "location_fallbacks": fallbacks,
+        "started": started,
+        "finished": finished,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+# ======================================================
+# Report
+# ======================================================
+def percentile(values, q):
+    if not values:
+        return None
+    # nearest-rank
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results, standins):
+    wall_time = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    latencies = [l for r in results for l in r["latencies"]]
+    errors = [e for r in results for e in r["errors"]]
+
+    def ms(v):
+        return None if v is None else round(v * 1000, 1)
+
+    return {
+        "requests": len(latencies) + len(errors),
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "location_fallbacks": sum(r["location_fallbacks"] for r in results),
+        "wall_time_s": round(wall_time, 2),
+        "throughput_rps": round(len(latencies) / wall_time, 2) if wall_time else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(max(latencies) if latencies else None),
+        },
+        "workers": [
+            {"worker": r["worker"], "pid": r["pid"], "sessions": r["sessions"],
+             "requests": len(r["latencies"]) + len(r["errors"]),
+             "peak_rss_mb": r["peak_rss_mb"]}
+            for r in results
+        ],
+        "upstream": {
+            name: {"served": s.served, "injected_errors": s.failed}
+            for name, s in standins.items()
+        },
+    }
+
+
+def print_report(report):
+    lat = report["latency_ms"]
+    print(f"requests      {report['requests']}  (ok {report['ok']}, errors {report['errors']}, "
+          f"location fallbacks {report['location_fallbacks']})")
+    print(f"wall time     {report['wall_time_s']} s")
+    print(f"throughput    {report['throughput_rps']} req/s")
+    print(f"latency (ms)  p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print("workers")
+    for w in report["workers"]:
+        print(f"  #{w['worker']} pid {w['pid']}: {w['sessions']} sessions, "
+              f"{w['requests']} requests, peak RSS {w['peak_rss_mb']} MB")
+    print("upstream stand-ins")
+    for name, s in report["upstream"].items():
+        print(f"  {name:<8} served {s['served']}, injected errors {s['injected_errors']}")
+    for e in report["error_samples"]:
+        print(f"  error: {e}")
+
+
+# ======================================================
+# CLI
+# ======================================================
+def parse_service(spec):
+    """
+    "tts=400:0.05" -> ("tts", 400.0, 0.05)
+    """
+    name, _, rest = spec.partition("=")
+    latency, _, error_rate = rest.partition(":")
+    if name not in SERVICES:
+        raise argparse.ArgumentTypeError(f"unknown service {name!r}")
+    return name, float(latency), float(error_rate or 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Astro Time Machine offline load test")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="worker processes")
+    parser.add_argument("--sessions", type=int, default=8,
+                        help="concurrent simulated sessions (spread over workers)")
+    parser.add_argument("--requests", type=int, default=3,
+                        help="'Generate sky' clicks per session")
+    parser.add_argument("--think", type=float, default=0.5,
+                        help="max pause between a session's requests (s)")
+    parser.add_argument("--latency", type=float, default=80.0,
+                        help="stand-in latency for every service (ms)")
+    parser.add_argument("--jitter", type=float, default=20.0,
+                        help="stand-in latency std deviation (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of stand-in responses that fail with 503")
+    parser.add_argument("--service", type=parse_service, action="append", default=[],
+                        metavar="NAME=LATENCY_MS[:ERROR_RATE]",
+                        help=f"per-service override, NAME is one of {', '.join(SERVICES)}")
+    parser.add_argument("--cache-dir",
+                        help="run in (and keep) this directory, so images and audio "
+                             "from earlier runs are reused; default: a fresh one per run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    standins = {
+        name: StandIn(name, respond, args.latency, args.jitter, args.error_rate)
+        for name, respond in SERVICES.items()
+    }
+    for name, latency, error_rate in args.service:
+        standins[name].latency_ms = latency
+        standins[name].error_rate = error_rate
+    for s in standins.values():
+        s.start()
+
+    env = service_env(standins)
+
+    # workers change directory, so a local ephemeris is passed by full path
+    from ephemeris import ephemeris_path
+    if os.path.exists(ephemeris_path()):
+        env["ASTRO_EPHEMERIS"] = os.path.abspath(ephemeris_path())
+
+    cache_dir = os.path.abspath(args.cache_dir) if args.cache_dir else None
+
+    per_worker = [args.sessions // args.workers] * args.workers
+    for i in range(args.sessions % args.workers):
+        per_worker[i] += 1
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [
+                pool.submit(_run_worker, i, n, args.requests, args.think,
+                            args.seed + i, env, cache_dir)
+                for i, n in enumerate(per_worker) if n
+            ]
+            results = [f.result() for f in futures]
+    finally:
+        for s in standins.values():
+            s.stop()
+
+    report = summarize(results, standins)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Process-wide memoization for sky computations.
+
+Results are keyed on the site rounded to `site_precision` decimals and the
+time floored to a `time_bucket_minutes` bucket, so many sessions asking
+for "London, tonight, 21:00" share one computation. Ephemeris results for
+a given instant never change, so entries have no TTL; the cache is only
+bounded in size (least recently used entries go first).
+
+Defaults can be set with ASTRO_MEMO_SIZE, ASTRO_MEMO_SITE_PRECISION and
+ASTRO_MEMO_TIME_BUCKET (minutes).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import time as dt_time
+from functools import update_wrapper
+
+from singleflight import SingleFlight
+
+
+DEFAULT_MAXSIZE = int(os.environ.get("ASTRO_MEMO_SIZE", 4096))
+DEFAULT_SITE_PRECISION = int(os.environ.get("ASTRO_MEMO_SITE_PRECISION", 2))
+DEFAULT_TIME_BUCKET = int(os.environ.get("ASTRO_MEMO_TIME_BUCKET", 1))
+
+# seconds a caller waits on someone else's computation of the same key;
+# a snapshot takes well under one, so this only trips on a stuck call
+WAIT_TIMEOUT = 30
+
+
+def quantize_site(latitude, longitude, precision):
+    return round(float(latitude), precision), round(float(longitude), precision)
+
+
+def quantize_time(time, bucket_minutes):
+    minutes = time.hour * 60 + time.minute
+    minutes -= minutes % bucket_minutes
+    return dt_time(minutes // 60, minutes % 60)
+
+
+class SkyMemo:
+    """
+    Wraps fn(date, time, latitude, longitude) with a quantized LRU cache.
+    The wrapped function is always called with the quantized arguments,
+    so a cached value is exactly what a fresh call would return.
+    Concurrent misses for one key share a single call.
+    """
+
+    def __init__(self, fn, maxsize=DEFAULT_MAXSIZE,
+                 site_precision=DEFAULT_SITE_PRECISION,
+                 time_bucket_minutes=DEFAULT_TIME_BUCKET):
+        update_wrapper(self, fn)
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._flight = SingleFlight(fn.__name__, timeout=WAIT_TIMEOUT)
+        self.configure(maxsize, site_precision, time_bucket_minutes)
+
+    def configure(self, maxsize=None, site_precision=None, time_bucket_minutes=None):
+        """
+        Changes the cache size or quantization. Changing the quantization
+        clears the cache, since old keys no longer line up.
+        """
+        with self._lock:
+            if site_precision is not None or time_bucket_minutes is not None:
+                self._cache.clear()
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if site_precision is not None:
+                self.site_precision = site_precision
+            if time_bucket_minutes is not None:
+                self.time_bucket_minutes = max(1, time_bucket_minutes)
+            self._reset_counters()
+            self._evict()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self):
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def key(self, date, time, latitude, longitude):
+        lat, lon = quantize_site(latitude, longitude, self.site_precision)
+        return date, quantize_time(time, self.time_bucket_minutes), lat, lon
+
+    def __call__(self, date, time, latitude, longitude):
+        key = self.key(date, time, latitude, longitude)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+
+        return self._flight.do(key, self._compute, key)
+
+    def _compute(self, key):
+        value = self.fn(*key)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            self._evict()
+
+        return value
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self._flight.shared,
+                "site_precision": self.site_precision,
+                "time_bucket_minutes": self.time_bucket_minutes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._reset_counters()
+
+
+def quantized_memo(maxsize=DEFAULT_MAXSIZE,
+                   site_precision=DEFAULT_SITE_PRECISION,
+                   time_bucket_minutes=DEFAULT_TIME_BUCKET):
+    def decorator(fn):
+        return SkyMemo(fn, maxsize, site_precision, time_bucket_minutes)
+    return decorator
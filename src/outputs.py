@@ -0,0 +1,75 @@
+"""
+Rendered sky images on disk.
+
+Images are named after their inputs and reused, so assets/output grows
+with every distinct site/time asked for. Past ASTRO_OUTPUT_MAX_MB (0 = no
+cap) the least recently used ones are deleted; reusing a file counts as
+using it.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+
+OUTPUT_DIR = Path("assets/output")
+OUTPUT_MAX_BYTES = float(os.environ.get("ASTRO_OUTPUT_MAX_MB", 500)) * 1e6
+
+# files used this recently are kept whatever the size, since their paths
+# may have just been handed out to a caller
+OUTPUT_GRACE_S = 60
+
+_prune_lock = threading.Lock()
+
+
+def reuse_outputs(paths):
+    """
+    True if every file in `paths` exists, marking them as recently used
+    so prune_outputs() keeps them.
+    """
+    try:
+        for path in paths:
+            os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def prune_outputs(max_bytes=None):
+    """
+    Deletes the least recently used sky images until OUTPUT_DIR fits in
+    `max_bytes` (default OUTPUT_MAX_BYTES). Returns how many were deleted.
+    """
+    max_bytes = OUTPUT_MAX_BYTES if max_bytes is None else max_bytes
+    if max_bytes <= 0 or not _prune_lock.acquire(blocking=False):
+        return 0
+
+    try:
+        files = []
+        for entry in os.scandir(OUTPUT_DIR):
+            if entry.name.startswith("sky_") and entry.name.endswith(".png"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        keep_after = time.time() - OUTPUT_GRACE_S
+        removed = 0
+
+        for mtime, size, path in sorted(files):
+            if total <= max_bytes or mtime > keep_after:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        return removed
+
+    finally:
+        _prune_lock.release()
@@ -0,0 +1,227 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+from snapshot import compute_snapshot, check_date
+from sky_generator import (
+    render_sky_sizes, build_sky_payload, sky_output_paths,
+    render_sky_preview, start_refinement,
+)
+from outputs import reuse_outputs
+from ai_interpreter import generate_sky_description, narration_segments
+import weather
+import geo
+import ai_voice
+import satellites
+from singleflight import SingleFlight
+
+
+# ===============================
+# External services
+# ===============================
+# Module-level so they can be swapped for the offline stubs
+get_cloud_cover = weather.get_cloud_cover
+lookup_city_coordinates = geo.lookup_city_coordinates
+synthesize_sentence = (
+    ai_voice.synthesize_sentence_http if ai_voice.TTS_URL
+    else ai_voice.synthesize_sentence
+)
+
+
+def use_offline_stubs():
+    """
+    Replaces weather, geocoding and TTS with the local stubs.
+    """
+    global get_cloud_cover, lookup_city_coordinates, synthesize_sentence
+
+    import stubs
+
+    get_cloud_cover = stubs.stub_cloud_cover
+    lookup_city_coordinates = stubs.stub_lookup_city
+    synthesize_sentence = stubs.stub_synthesize_sentence
+
+
+# ===============================
+# Interactive load (for the warm-up scheduler)
+# ===============================
+# set by warmup.start_warmup(); sees every interactive request
+warm_scheduler = None
+
+_interactive = 0
+_interactive_lock = threading.Lock()
+
+
+def interactive_in_flight():
+    """
+    Number of user-facing generate_sky() calls running right now.
+    """
+    return _interactive
+
+
+def _track_interactive(delta):
+    global _interactive
+    with _interactive_lock:
+        _interactive += delta
+
+
+def start_voice_narration(text, snapshot=None, location=None):
+    """
+    Starts background narration of `text`. Given the snapshot it was
+    generated from, reusable phrases come from the clip library.
+    """
+    segments = None
+    if snapshot is not None:
+        segments = narration_segments(snapshot, location)
+
+    return ai_voice.NarrationStream(text, synthesize=synthesize_sentence, segments=segments)
+
+
+# renders are named after their inputs, so the file name is the key
+_render_flight = SingleFlight("render", timeout=60)
+
+
+def sky_key(date, time, latitude, longitude):
+    """
+    Short stable id for a site + instant, used for output file names.
+    """
+    raw = f"{date.isoformat()}T{time.strftime('%H:%M')}@{latitude:.4f},{longitude:.4f}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def satellites_for(snapshot):
+    """
+    Satellites above the horizon for a snapshot's site and instant, or
+    None when no TLE file is installed or none of its elements are
+    current for that instant.
+    """
+    catalog = satellites.current_catalog(snapshot.datetime_utc)
+    if catalog is None:
+        return None
+    return satellites.satellites_at(
+        catalog, snapshot.datetime_utc, snapshot.latitude, snapshot.longitude
+    )
+
+
+def satellite_passes(date, time, latitude, longitude, hours=12, visible_only=True):
+    """
+    Passes over the site in the `hours` after date/time (UTC), or None
+    when no TLE file is installed or none of its elements are current
+    for that window.
+    """
+    start = datetime.combine(date, time).replace(tzinfo=timezone.utc)
+
+    catalog = satellites.current_catalog(start, start + timedelta(hours=hours))
+    if catalog is None:
+        return None
+
+    return satellites.predict_passes(
+        catalog, latitude, longitude, start, hours=hours, visible_only=visible_only
+    )
+
+
+# ===============================
+# Full "Generate sky" pipeline
+# ===============================
+def generate_sky(location, date, time, latitude, longitude, with_voice=True,
+                 output="png", image_sizes=("display",), with_satellites=False,
+                 warm=False, session=None):
+    """
+    Runs weather → snapshot → render → narration → voice for one request.
+
+    output="png" rasterizes the sky on the server; output="vector" only
+    builds the position payload for the browser to draw (sky_canvas.py);
+    output=None skips drawing altogether. image_sizes picks which of
+    sky_generator.RENDER_SIZES, or pixel sizes, are written (one render
+    pass for all).
+    output="progressive" writes a quick preview (image_path) and renders
+    image_sizes in the background; result["refinement"] resolves to their
+    paths, and a newer request with the same `session` cancels it.
+    with_satellites adds the TLE satellite layer when a catalog is installed.
+    warm=True marks a warm-up run (see warmup.py), which is not counted
+    as interactive load.
+
+    Images and narration audio are named after their inputs, so ones
+    that already exist on disk are reused instead of rebuilt.
+
+    Returns a dict with everything the UI (or the API) needs to display.
+    """
+    if warm:
+        return _generate_sky(location, date, time, latitude, longitude, with_voice,
+                             output, image_sizes, with_satellites, session)
+
+    if warm_scheduler is not None:
+        warm_scheduler.record_request(date, time, latitude, longitude)
+
+    _track_interactive(+1)
+    try:
+        return _generate_sky(location, date, time, latitude, longitude, with_voice,
+                             output, image_sizes, with_satellites, session)
+    finally:
+        _track_interactive(-1)
+
+
+def _generate_sky(location, date, time, latitude, longitude, with_voice,
+                  output, image_sizes, with_satellites, session=None):
+    # before any upstream call, so out-of-range dates cost nothing
+    check_date(date)
+
+    cloud_cover = get_cloud_cover(latitude, longitude)
+
+    snapshot = compute_snapshot(date, time, latitude, longitude, cloud_cover)
+
+    sats = satellites_for(snapshot) if with_satellites else None
+
+    image_paths = {}
+    preview_path = None
+    refinement = None
+    sky_payload = None
+
+    if output == "vector":
+        sky_payload = build_sky_payload(snapshot, satellites=sats)
+    elif output in ("png", "progressive"):
+        # the render depends on cloud cover (star dimming) as well
+        key = f"{sky_key(date, time, latitude, longitude)}_c{cloud_cover}"
+        filename = f"sky_{key}_sat.png" if sats is not None else f"sky_{key}.png"
+
+        paths = sky_output_paths(filename, image_sizes)
+        if reuse_outputs(paths.values()):
+            pass
+        elif output == "progressive":
+            preview_path = str(render_sky_preview(snapshot, filename, satellites=sats))
+            refinement = start_refinement(snapshot, image_sizes, filename=filename,
+                                          satellites=sats, session=session)
+            paths = {}
+        else:
+            paths = _render_flight.do(
+                (filename, tuple(image_sizes)), render_sky_sizes,
+                snapshot, image_sizes, filename=filename, satellites=sats,
+            )
+        image_paths = {name: str(path) for name, path in paths.items()}
+
+    summary = generate_sky_description(snapshot, location)
+
+    voice_path = None
+    if with_voice:
+        voice_path = start_voice_narration(summary, snapshot, location).result(
+            ai_voice.NARRATION_TIMEOUT
+        )
+
+    return {
+        "snapshot": snapshot,
+        "moon": snapshot.moon_dict(),
+        "cloud_cover": cloud_cover,
+        "moon_status": snapshot.moon_status,
+        "visible_planets": snapshot.visible_planets,
+        "satellites": None if sats is None else [
+            {"name": str(name), "altitude": round(float(alt), 2),
+             "azimuth": round(float(az), 2), "naked_eye": bool(lit)}
+            for name, alt, az, lit in zip(sats.names, sats.alt, sats.az, sats.naked_eye)
+        ],
+        "image_path": (image_paths.get("display")
+                       or next(iter(image_paths.values()), preview_path)),
+        "image_paths": image_paths,
+        "refinement": refinement,
+        "sky_payload": sky_payload,
+        "summary": summary,
+        "voice_path": voice_path,
+    }
@@ -0,0 +1,321 @@
+"""
+Artificial satellite layer.
+
+Reads a local TLE file and propagates the whole catalog at once with
+sgp4's SatrecArray (the C propagator loops over satellites and times, not
+Python). Everything after propagation - TEME to Earth-fixed rotation,
+topocentric alt/az, sunlight and pass detection - is numpy on
+(satellites x times) arrays, so thousands of objects per frame are cheap.
+
+The TLE file is ASTRO_TLE_FILE (default assets/tle/active.tle); drop in a
+fresh export from CelesTrak or Space-Track to use it. assets/tle/sample.tle
+is a small fixture (ISS plus synthetic LEO objects, epoch 2019-12-09) for
+offline development. Satellites are only placed within
+ASTRO_TLE_MAX_AGE_DAYS (default 3) of their TLE epoch; further out SGP4
+extrapolation is meaningless.
+"""
+
+import os
+from datetime import timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from sgp4.api import Satrec, SatrecArray
+
+
+TLE_FILE = os.environ.get("ASTRO_TLE_FILE", "assets/tle/active.tle")
+
+EARTH_RADIUS_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+
+# naked-eye pass: satellite sunlit and the observer in nautical twilight
+VISIBLE_SUN_ALT = -6.0
+
+# keeps (satellites x times) work arrays to a few tens of MB
+MAX_CELLS_PER_CHUNK = 2_000_000
+
+# SGP4 errors grow by kilometres a day away from the TLE epoch, so
+# satellites are only placed within this many days of theirs
+MAX_TLE_AGE_DAYS = float(os.environ.get("ASTRO_TLE_MAX_AGE_DAYS", 3))
+
+
+# ==========================
+# Catalog
+# ==========================
+class SatelliteCatalog:
+
+    __slots__ = ("names", "satrecs", "array", "epochs")
+
+    def __init__(self, names, satrecs):
+        self.names = np.array(names)
+        self.satrecs = satrecs
+        self.array = SatrecArray(satrecs)
+        self.epochs = np.array([s.jdsatepoch + s.jdsatepochF for s in satrecs])
+
+    def __len__(self):
+        return len(self.satrecs)
+
+    def current(self, start, end=None, max_age_days=MAX_TLE_AGE_DAYS):
+        """
+        The satellites whose TLE epoch is within `max_age_days` of every
+        instant from `start` to `end`, as a catalog (possibly empty).
+        """
+        jd, fr = _julian_dates([start, end or start])
+        first, last = jd + fr
+
+        fresh = (self.epochs >= last - max_age_days) & (self.epochs <= first + max_age_days)
+        if fresh.all():
+            return self
+        return SatelliteCatalog(self.names[fresh], [s for s, f in zip(self.satrecs, fresh) if f])
+
+
+def parse_tle(text):
+    """
+    Parses 3-line (name + two lines) or bare 2-line TLE text.
+    """
+    lines = [l.rstrip() for l in text.splitlines() if l.strip()]
+    names, satrecs = [], []
+
+    i = 0
+    while i < len(lines):
+        if lines[i].startswith("1 ") and i + 1 < len(lines) and lines[i + 1].startswith("2 "):
+            name, l1, l2 = lines[i][2:7].strip(), lines[i], lines[i + 1]
+            i += 2
+        elif i + 2 < len(lines):
+            name, l1, l2 = lines[i].strip(), lines[i + 1], lines[i + 2]
+            i += 3
+        else:
+            break
+
+        names.append(name)
+        satrecs.append(Satrec.twoline2rv(l1, l2))
+
+    return SatelliteCatalog(names, satrecs)
+
+
+def load_tle_file(path):
+    return parse_tle(Path(path).read_text())
+
+
+@lru_cache(maxsize=1)
+def load_default_catalog():
+    """
+    The catalog at TLE_FILE, or None when no TLE file is installed.
+    """
+    if not Path(TLE_FILE).exists():
+        return None
+    return load_tle_file(TLE_FILE)
+
+
+def current_catalog(start, end=None):
+    """
+    The default catalog cut to satellites that can be placed from
+    `start` to `end`, or None when there are none (no TLE file, or
+    dates too far from its epochs).
+    """
+    catalog = load_default_catalog()
+    if catalog is None:
+        return None
+    catalog = catalog.current(start, end)
+    return catalog if len(catalog) else None
+
+
+# ==========================
+# Time & frames
+# ==========================
+def _julian_dates(datetimes):
+    """
+    UTC datetimes -> (jd, fr) arrays as sgp4 expects them.
+    """
+    stamps = np.array([dt.replace(tzinfo=dt.tzinfo or timezone.utc).timestamp()
+                       for dt in datetimes])
+    jd_full = stamps / 86400.0 + 2440587.5
+    jd = np.floor(jd_full - 0.5) + 0.5
+    return jd, jd_full - jd
+
+
+def _gmst(jd_full):
+    """
+    Greenwich mean sidereal time in radians (IAU 1982, UT1 ~ UTC).
+    """
+    t = (jd_full - 2451545.0) / 36525.0
+    seconds = (67310.54841 + (876600.0 * 3600 + 8640184.812866) * t
+               + 0.093104 * t ** 2 - 6.2e-6 * t ** 3)
+    return np.radians((seconds % 86400.0) / 240.0)
+
+
+def _sun_direction(jd_full):
+    """
+    Unit vectors (times x 3) to the Sun in the equatorial frame, low
+    precision (~0.01 deg), good enough for shadow and twilight tests.
+    """
+    n = jd_full - 2451545.0
+    g = np.radians(357.528 + 0.9856003 * n)
+    lon = np.radians(280.460 + 0.9856474 * n + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    eps = np.radians(23.439 - 0.0000004 * n)
+    return np.stack([np.cos(lon), np.cos(eps) * np.sin(lon), np.sin(eps) * np.sin(lon)], axis=-1)
+
+
+def _to_earth_fixed(vectors, gmst):
+    """
+    Rotates (..., times, 3) inertial vectors about z by GMST.
+    """
+    c, s = np.cos(gmst), np.sin(gmst)
+    x, y, z = vectors[..., 0], vectors[..., 1], vectors[..., 2]
+    return np.stack([c * x + s * y, -s * x + c * y, z], axis=-1)
+
+
+def _observer_frame(latitude, longitude, elevation_m):
+    """
+    Observer position (km, Earth-fixed) and its east/north/up unit vectors.
+    """
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    e2 = WGS84_F * (2 - WGS84_F)
+    n = EARTH_RADIUS_KM / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    h = elevation_m / 1000.0
+
+    position = np.array([
+        (n + h) * np.cos(lat) * np.cos(lon),
+        (n + h) * np.cos(lat) * np.sin(lon),
+        (n * (1 - e2) + h) * np.sin(lat),
+    ])
+    east = np.array([-np.sin(lon), np.cos(lon), 0.0])
+    north = np.array([-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)])
+    up = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+    return position, east, north, up
+
+
+# ==========================
+# Batch propagation
+# ==========================
+def propagate(catalog, datetimes, latitude, longitude, elevation_m=0.0):
+    """
+    Alt/az of every satellite at every time.
+
+    Returns (alt, az, sunlit, sun_alt): alt/az/sunlit are
+    (satellites x times) arrays, sun_alt is per time. Satellites that
+    fail to propagate (decayed, bad TLE) get NaN altitude.
+    """
+    jd, fr = _julian_dates(datetimes)
+    jd_full = jd + fr
+
+    obs, east, north, up = _observer_frame(latitude, longitude, elevation_m)
+    gmst = _gmst(jd_full)
+
+    sun = _sun_direction(jd_full)
+    sun_alt = np.degrees(np.arcsin(_to_earth_fixed(sun, gmst) @ up))
+
+    n_sats, n_times = len(catalog), len(jd)
+    alt = np.empty((n_sats, n_times), dtype=np.float32)
+    az = np.empty((n_sats, n_times), dtype=np.float32)
+    sunlit = np.empty((n_sats, n_times), dtype=bool)
+
+    step = max(1, MAX_CELLS_PER_CHUNK // max(1, n_sats))
+
+    for start in range(0, n_times, step):
+        sl = slice(start, start + step)
+
+        error, r, _ = catalog.array.sgp4(jd[sl], fr[sl])   # r: sats x times x 3 (km, TEME)
+
+        # Earth's cylindrical shadow
+        along = np.einsum("stk,tk->st", r, sun[sl])
+        perp = np.linalg.norm(r - along[..., None] * sun[sl], axis=-1)
+        sunlit[:, sl] = (along > 0) | (perp > EARTH_RADIUS_KM)
+
+        d = _to_earth_fixed(r, gmst[sl]) - obs
+        e, n, u = d @ east, d @ north, d @ up
+
+        a = np.degrees(np.arctan2(u, np.hypot(e, n)))
+        a[error != 0] = np.nan
+        alt[:, sl] = a
+        az[:, sl] = np.degrees(np.arctan2(e, n)) % 360
+
+    return alt, az, sunlit, sun_alt
+
+
+class SatellitePositions:
+    """
+    Satellites above the horizon at one instant (parallel arrays).
+    """
+
+    __slots__ = ("names", "alt", "az", "sunlit", "sun_alt")
+
+    def __init__(self, names, alt, az, sunlit, sun_alt):
+        self.names = names
+        self.alt = alt
+        self.az = az
+        self.sunlit = sunlit
+        self.sun_alt = sun_alt
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def naked_eye(self):
+        """
+        Mask of satellites that can actually be seen (sunlit, dark sky).
+        """
+        return self.sunlit & (self.sun_alt < VISIBLE_SUN_ALT)
+
+
+def satellites_at(catalog, dt, latitude, longitude, min_alt=0.0):
+    """
+    Satellites above `min_alt` at `dt`, leaving out those whose TLE is
+    too old (or too new) to place them then.
+    """
+    catalog = catalog.current(dt)
+    alt, az, sunlit, sun_alt = propagate(catalog, [dt], latitude, longitude)
+    alt, az, sunlit = alt[:, 0], az[:, 0], sunlit[:, 0]
+
+    up = alt > min_alt   # NaN compares False
+    return SatellitePositions(catalog.names[up], alt[up], az[up], sunlit[up], float(sun_alt[0]))
+
+
+# ==========================
+# Pass prediction
+# ==========================
+def predict_passes(catalog, latitude, longitude, start, hours=12, step_seconds=30,
+                   min_alt=10.0, visible_only=True):
+    """
+    Passes above `min_alt` between `start` and `start + hours`.
+
+    Each pass is a dict with name, rise/culmination/set (UTC datetimes),
+    max_alt and whether it is naked-eye visible at some point. Sorted by
+    rise time. Satellites whose TLE is too far from the window are skipped.
+    """
+    start = start.replace(tzinfo=start.tzinfo or timezone.utc)
+    n_steps = int(hours * 3600 // step_seconds) + 1
+    times = [start + timedelta(seconds=i * step_seconds) for i in range(n_steps)]
+
+    catalog = catalog.current(times[0], times[-1])
+
+    alt, _, sunlit, sun_alt = propagate(catalog, times, latitude, longitude)
+
+    above = alt >= min_alt
+    seen = above & sunlit & (sun_alt < VISIBLE_SUN_ALT)
+
+    # rising / setting edges for every satellite at once
+    padded = np.pad(above, ((0, 0), (1, 1))).astype(np.int8)
+    edges = np.diff(padded, axis=1)
+    rises = np.argwhere(edges == 1)      # (sat, index), row-major so
+    sets = np.argwhere(edges == -1)      # rises[i] pairs with sets[i]
+
+    passes = []
+    for (sat, i0), (_, i1) in zip(rises, sets):
+        if visible_only and not seen[sat, i0:i1].any():
+            continue
+
+        peak = i0 + int(np.nanargmax(alt[sat, i0:i1]))
+        passes.append({
+            "name": str(catalog.names[sat]),
+            "rise": times[i0],
+            "culmination": times[peak],
+            "set": times[i1 - 1],
+            "max_alt": round(float(alt[sat, peak]), 1),
+            "visible": bool(seen[sat, i0:i1].any()),
+        })
+
+    passes.sort(key=lambda p: p["rise"])
+    return passes
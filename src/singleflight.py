@@ -0,0 +1,93 @@
+"""
+Single-flight call coalescing.
+
+When many sessions ask for the same thing at once (a trending city at
+21:00), only the first caller for a key does the work; everyone else
+arriving while it runs waits for that result instead of repeating the
+upstream request or the render. Nothing is kept once the call finishes,
+caching stays with the callers (memo.py, the forecast cache, files on
+disk), so keys should match the ones those results are stored under.
+
+Waiters give up after `timeout` seconds with TimeoutError (the leader
+carries on); an exception raised by the leader is raised in every waiter.
+"""
+
+import threading
+
+
+class _Call:
+
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        self.executed = 0
+        self.shared = 0
+        self.timeouts = 0
+
+        REGISTRY[name] = self
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """
+        fn(*args, **kwargs), run once for all concurrent callers of `key`.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if leader:
+            try:
+                call.value = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        elif not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"{self.name}: still waiting for {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def stats(self):
+        with self._lock:
+            calls = self.executed + self.shared
+            return {
+                "executed": self.executed,
+                "shared": self.shared,
+                "timeouts": self.timeouts,
+                "in_flight": len(self._calls),
+                "shared_rate": round(self.shared / calls, 4) if calls else 0.0,
+            }
+
+
+# every SingleFlight by name, for /stats
+REGISTRY = {}
+
+
+def stats():
+    return {name: flight.stats() for name, flight in REGISTRY.items()}
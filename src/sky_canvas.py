@@ -0,0 +1,125 @@
+"""
+Browser-side sky renderer.
+
+Draws a payload from sky_generator.build_sky_payload() onto a <canvas>,
+so the server only ships a few KB of positions instead of a PNG.
+Sizes follow the matplotlib render: a 6in figure is 432pt across, so a
+scatter marker of area s (pt²) has radius sqrt(s) / 2 / 432 in sky units.
+"""
+
+from sky_generator import encode_sky_payload
+
+
+SKY_CANVAS_TEMPLATE = """
+<div style="display:flex;justify-content:center;">
+<canvas id="sky" width="__SIZE__" height="__SIZE__" style="
+    width:__SIZE__px;height:__SIZE__px;border-radius:50%;
+    border:2px solid rgba(120,170,255,.7);
+    box-shadow:0 0 40px rgba(25,80,200,.6), 0 0 120px rgba(25,80,200,.4);
+"></canvas>
+</div>
+<script>
+(function () {
+    const sky = __PAYLOAD__;
+    const canvas = document.getElementById("sky");
+    const dpr = window.devicePixelRatio || 1;
+    const S = canvas.width;
+
+    canvas.width = S * dpr;
+    canvas.height = S * dpr;
+    const ctx = canvas.getContext("2d");
+    ctx.scale(dpr, dpr);
+
+    // sky units (0..1, y up) -> canvas pixels
+    const X = (x) => x * S;
+    const Y = (y) => (1 - y) * S;
+    const R = (s) => Math.sqrt(s) / 2 / 432 * S;   // scatter area (pt^2) -> px
+
+    function dot(x, y, r, color, alpha) {
+        ctx.globalAlpha = alpha;
+        ctx.fillStyle = color;
+        ctx.beginPath();
+        ctx.arc(X(x), Y(y), r, 0, 2 * Math.PI);
+        ctx.fill();
+    }
+
+    function label(text, x, y, color = "white", pt = 11) {
+        ctx.globalAlpha = 1;
+        ctx.fillStyle = color;
+        ctx.font = (pt / 432 * S) + "px sans-serif";
+        ctx.textAlign = "center";
+        ctx.fillText(text, X(x), Y(y));
+    }
+
+    // seeded PRNG (mulberry32) so a payload always draws the same field
+    let seed = sky.bg.seed >>> 0;
+    function rand() {
+        seed = (seed + 0x6D2B79F5) >>> 0;
+        let t = seed;
+        t = Math.imul(t ^ (t >>> 15), t | 1);
+        t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    }
+
+    // ---------------- background ----------------
+    ctx.fillStyle = "#02030c";
+    ctx.fillRect(0, 0, S, S);
+
+    // ---------------- stars ----------------
+    for (let i = 0; i < sky.bg.n; i++) {
+        const x = rand(), y = rand(), s = 10 + 50 * rand(), c = rand();
+        const color = c < 0.6 ? "#ffffff" : (c < 0.85 ? "#dbe9ff" : "#ffe7c7");
+        dot(x, y, R(s), color, sky.bg.alpha);
+    }
+
+    // ---------------- constellations ----------------
+    ctx.globalAlpha = 0.65;
+    ctx.strokeStyle = "#8fa4ff";
+    ctx.lineWidth = 1.4 / 432 * S;
+    for (const line of sky.lines) {
+        ctx.beginPath();
+        line.forEach(([x, y], i) => i ? ctx.lineTo(X(x), Y(y)) : ctx.moveTo(X(x), Y(y)));
+        ctx.stroke();
+    }
+    for (const [x, y, mag] of sky.stars) {
+        dot(x, y, R(Math.max(8, 70 - 18 * mag)), "#ffffff", 0.95);
+    }
+
+    // ---------------- planets ----------------
+    for (const [name, x, y] of sky.planets) {
+        dot(x, y, R(900), "#ffde9c", 0.35);
+        dot(x, y, R(280), "#ffd27d", 1.0);
+        label(name, x, y - 0.06);
+    }
+
+    // ---------------- satellites ----------------
+    for (const [x, y, lit, name] of sky.sats || []) {
+        const side = Math.sqrt(lit ? 12 : 4) / 432 * S;   // square marker, area in pt^2
+        ctx.globalAlpha = lit ? 0.95 : 0.5;
+        ctx.fillStyle = lit ? "#9df2ff" : "#5f6b8f";
+        ctx.fillRect(X(x) - side / 2, Y(y) - side / 2, side, side);
+        if (name) label(name, x, y - 0.03, "#9df2ff", 8);
+    }
+
+    // ---------------- moon ----------------
+    if (sky.moon) {
+        const [x, y, r, offset] = sky.moon;
+        dot(x, y, R(1800), "white", 0.12);
+        dot(x, y, R(650), "white", 0.95);
+        dot(x + offset, y, r * S, "#02030c", 1.0);
+        label("Moon", x, y - 0.08);
+    }
+})();
+</script>
+"""
+
+
+def sky_canvas_html(payload, size=430):
+    """
+    Self-contained HTML/JS snippet that draws `payload` at `size` px.
+    """
+    return (
+        SKY_CANVAS_TEMPLATE
+        .replace("__SIZE__", str(int(size)))
+        .replace("__PAYLOAD__", encode_sky_payload(payload))
+    )
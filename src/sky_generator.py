@@ -1,57 +1,18 @@
+import io
+import json
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
 from pathlib import Path
-from datetime import datetime, timezone
-
-from skyfield.api import load, wgs84, Star
-
-# ==========================
-# Skyfield setup
-# ==========================
-eph = load("de421.bsp")
-ts = load.timescale()
-
-# ==========================
-# Planet keys
-# ==========================
-PLANETS = {
-    "Jupiter": "jupiter barycenter",
-    "Saturn": "saturn barycenter",
-    "Mars": "mars",
-    "Venus": "venus",
-}
+from PIL import Image, ImageDraw, ImageFont
 
-# ==========================
-# Minimal constellation set
-# (we can expand later)
-# ==========================
-CONSTELLATIONS = {
-    "Orion": [
-        ("Betelgeuse", 88.79, 7.40),
-        ("Bellatrix", 81.28, 6.34),
-        ("Alnitak", 85.18, -1.94),
-        ("Alnilam", 84.05, -1.20),
-        ("Mintaka", 83.00, -0.29),
-        ("Saiph", 86.93, -9.66),
-        ("Rigel", 78.63, -8.20),
-    ],
-    "Cassiopeia": [
-        ("Schedar", 10.12, 56.53),
-        ("Caph", 2.29, 59.14),
-        ("Ruchbah", 10.12, 60.23),
-        ("Tsih", 14.17, 60.71),
-        ("Segin", 28.59, 63.67),
-    ],
-    "Ursa Major": [
-        ("Dubhe", 165.46, 61.75),
-        ("Merak", 165.93, 56.38),
-        ("Phecda", 178.45, 53.69),
-        ("Megrez", 183.85, 57.03),
-        ("Alioth", 193.50, 55.95),
-        ("Mizar", 200.98, 54.92),
-        ("Alkaid", 206.88, 49.31),
-    ],
-}
+from snapshot import compute_snapshot, STAR_MAGNITUDES
+import outputs
 
 
 # ==========================
@@ -67,41 +28,20 @@ def project_star_to_sky(az_deg, alt_deg):
     return x, y
 
 
-# ==========================
-# Convert RA/Dec → Alt/Az
-# ==========================
-def get_star_altaz(ra_deg, dec_deg, t, observer):
-    star = Star(ra_hours=ra_deg / 15, dec_degrees=dec_deg)
-    astrometric = observer.at(t).observe(star).apparent()
-    alt, az, _ = astrometric.altaz()
-    return alt.degrees, az.degrees
-
-
 # ==========================
 # Draw constellation lines
 # ==========================
-def draw_constellations(ax, t, observer):
-
-    for name, stars in CONSTELLATIONS.items():
-
-        pts = []
+def draw_constellations(ax, snapshot):
 
-        for (_, ra, dec) in stars:
-
-            alt, az = get_star_altaz(ra, dec, t, observer)
-
-            # only draw if above horizon
-            if alt <= 0:
-                continue
-
-            x, y = project_star_to_sky(az, alt)
-            pts.append((x, y))
+    for name, pts in snapshot.constellation_geometry().items():
 
         if len(pts) < 2:
             continue
 
-        xs = [p[0] for p in pts]
-        ys = [p[1] for p in pts]
+        xy = [project_star_to_sky(az, alt) for (_, alt, az) in pts]
+
+        xs = [p[0] for p in xy]
+        ys = [p[1] for p in xy]
 
         ax.plot(
             xs, ys,
@@ -112,30 +52,60 @@ def draw_constellations(ax, t, observer):
 
 
 # ==========================
-# MAIN SKY RENDER
+# Output sizes (pixels per side)
 # ==========================
-def generate_sky_image(
-    date,
-    time,
-    latitude,
-    longitude,
-    cloud_cover=0,
-    moon_phase=None,
-    moon_altitude=None,
-    moon_azimuth=None,
-    show_constellations=True,
-    filename="sky.png"
-):
+FIGURE_INCHES = 6
+
+LABELLED_SATELLITES = ("ISS", "TIANGONG", "CSS", "HST")
+
+RENDER_SIZES = {
+    "thumbnail": 160,
+    "display": 480,      # UI shows a min(430px, 60vh) circle
+    "download": 1440,    # the old fixed 6in x 240dpi render
+}
+
+# pixel counts are accepted as sizes too, clamped to this range
+MIN_RENDER_PX = 32
+MAX_RENDER_PX = 2048
 
-    output_dir = Path("assets/output")
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    dt = datetime.combine(date, time).replace(tzinfo=timezone.utc)
-    t = ts.from_datetime(dt)
+def render_px(size):
+    """
+    Pixels per side for `size`: a RENDER_SIZES name or a pixel count
+    (an int, or digits as they come in a query string), clamped to
+    MIN_RENDER_PX..MAX_RENDER_PX.
+    """
+    if size in RENDER_SIZES:
+        return RENDER_SIZES[size]
+    try:
+        px = int(size)
+    except (TypeError, ValueError):
+        px = 0
+    if px <= 0:
+        raise ValueError(f"size must be one of {', '.join(RENDER_SIZES)} or a pixel count")
+    return min(max(px, MIN_RENDER_PX), MAX_RENDER_PX)
 
-    observer = eph["earth"] + wgs84.latlon(latitude, longitude)
 
-    fig, ax = plt.subplots(figsize=(6, 6))
+def _size_label(size):
+    # file name part: the preset name, or the clamped pixel count
+    return size if size in RENDER_SIZES else f"{render_px(size)}px"
+
+
+# ==========================
+# MAIN SKY RENDER
+# ==========================
+def draw_sky(snapshot, show_constellations=True, satellites=None):
+    """
+    Builds the sky figure. Nothing is rasterized here; marker, line and
+    font sizes are in points on a fixed 6in figure, so they scale with
+    the output resolution chosen when the figure is saved.
+
+    `satellites` is an optional satellites.SatellitePositions.
+    """
+    cloud_cover = snapshot.cloud_cover or 0
+
+    fig = Figure(figsize=(FIGURE_INCHES, FIGURE_INCHES))
+    ax = fig.subplots()
     fig.patch.set_facecolor("#02030c")
 
     ax.set_xlim(0, 1)
@@ -144,7 +114,7 @@ def generate_sky_image(
 
     # ---------------- depth glow ----------------
     for r in np.linspace(1.2, 0.2, 60):
-            ax.add_patch(plt.Circle(
+            ax.add_patch(Circle(
                 (0.5, 0.5),
                 radius=r,
                 color="#02030c",
@@ -166,22 +136,14 @@ def generate_sky_image(
         alpha=0.9 * star_visibility
     )
 
-    visible_planets = []
-
     # ---------------- planets ----------------
-    for name, key in PLANETS.items():
-
-        planet = eph[key]
-        astrometric = observer.at(t).observe(planet).apparent()
-        alt, az, _ = astrometric.altaz()
+    for name, alt, az in snapshot.planets:
 
-        if alt.degrees <= 0:
+        if alt <= 0:
             continue
 
-        visible_planets.append(name)
-
-        px = 0.5 + np.sin(np.radians(az.degrees)) * 0.35
-        py = 0.5 + np.cos(np.radians(az.degrees)) * 0.35
+        px = 0.5 + np.sin(np.radians(az)) * 0.35
+        py = 0.5 + np.cos(np.radians(az)) * 0.35
 
         ax.scatter(px, py, s=900, color="#ffde9c", alpha=0.35)
         ax.scatter(px, py, s=280, color="#ffd27d", alpha=1.0)
@@ -193,42 +155,372 @@ def generate_sky_image(
 
     # ---------------- constellations ----------------
     if show_constellations:
-        draw_constellations(ax, t, observer)
+        draw_constellations(ax, snapshot)
+
+    # ---------------- satellites ----------------
+    if satellites is not None and len(satellites):
+        draw_satellites(ax, satellites)
 
     # ---------------- moon ----------------
-    if (
-        moon_altitude is not None
-        and moon_azimuth is not None
-        and moon_altitude > 0
-    ):
-        mx = 0.5 + np.sin(np.radians(moon_azimuth)) * 0.32
-        my = 0.5 + np.cos(np.radians(moon_azimuth)) * 0.32
+    if snapshot.moon_alt > 0:
+        mx = 0.5 + np.sin(np.radians(snapshot.moon_az)) * 0.32
+        my = 0.5 + np.cos(np.radians(snapshot.moon_az)) * 0.32
 
         moon_r = 0.05
+        moon_phase = snapshot.moon_illumination / 100
 
         ax.scatter(mx, my, s=1800, color="white", alpha=0.12)
         ax.scatter(mx, my, s=650, color="white", alpha=0.95)
 
-        if moon_phase is not None:
-            offset = (0.5 - moon_phase) * (moon_r * 2)
-            shadow = plt.Circle((mx + offset, my), moon_r, color="#02030c")
-            ax.add_patch(shadow)
+        offset = (0.5 - moon_phase) * (moon_r * 2)
+        shadow = Circle((mx + offset, my), moon_r, color="#02030c")
+        ax.add_patch(shadow)
 
         ax.text(mx, my - 0.08, "Moon",
                 color="white",
                 ha="center",
                 fontsize=11)
 
-    # ---------------- save ----------------
-    filepath = output_dir / filename
+    return fig
+
+
+def draw_satellites(ax, satellites):
+    """
+    One scatter per brightness class, however many satellites are up.
+    """
+    xs, ys = project_star_to_sky(satellites.az, satellites.alt)
+    lit = satellites.naked_eye
+
+    ax.scatter(xs[~lit], ys[~lit], s=4, marker="s", color="#5f6b8f", alpha=0.5)
+    ax.scatter(xs[lit], ys[lit], s=12, marker="s", color="#9df2ff", alpha=0.95)
+
+    for name, x, y in zip(satellites.names, xs, ys):
+        if name.startswith(LABELLED_SATELLITES):
+            ax.text(x, y - 0.03, name.split(" (")[0],
+                    color="#9df2ff",
+                    ha="center",
+                    fontsize=8)
+
+
+def sky_output_paths(filename, sizes):
+    """
+    {size: filepath} that save_sky_sizes() writes for `filename`.
+    """
+    output_dir = outputs.OUTPUT_DIR
+    stem, suffix = Path(filename).stem, Path(filename).suffix or ".png"
+    return {size: output_dir / f"{stem}_{_size_label(size)}{suffix}" for size in sizes}
+
+
+def save_sky_sizes(fig, filename, sizes):
+    """
+    Rasterizes `fig` once at the largest requested size and downsamples
+    that bitmap for the smaller ones. Sizes are RENDER_SIZES names or
+    pixel counts (see render_px).
+
+    Returns {size: filepath}.
+    """
+    paths = sky_output_paths(filename, sizes)
+    outputs.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    plt.savefig(
-        filepath,
-        dpi=240,
+    largest = max(render_px(size) for size in sizes)
+
+    buf = io.BytesIO()
+    fig.savefig(
+        buf,
+        format="png",
+        dpi=largest / FIGURE_INCHES,
         pad_inches=0,
         facecolor=fig.get_facecolor()
     )
 
-    plt.close()
+    image = Image.open(buf)
+    image.load()
+
+    for name, filepath in paths.items():
+        px = render_px(name)
+
+        # written aside and renamed, so a reader never sees half a file
+        tmp = filepath.with_name(f".{uuid.uuid4().hex[:6]}.{filepath.name}")
+
+        if px == largest:
+            tmp.write_bytes(buf.getvalue())
+        else:
+            image.resize((px, px), Image.LANCZOS).save(tmp, optimize=True)
+
+        tmp.replace(filepath)
+
+    outputs.prune_outputs()
+    return paths
+
+
+def render_sky_sizes(snapshot, sizes=("thumbnail", "display", "download"),
+                     show_constellations=True, filename="sky.png", satellites=None):
+    fig = draw_sky(snapshot, show_constellations, satellites)
+    return save_sky_sizes(fig, filename, sizes)
+
+
+def render_sky_image(snapshot, show_constellations=True, filename="sky.png",
+                     size="display", satellites=None):
+    """
+    Renders one size and returns its filepath.
+    """
+    paths = render_sky_sizes(snapshot, (size,), show_constellations, filename, satellites)
+    return paths[size]
+
+
+def generate_sky_image(
+    date,
+    time,
+    latitude,
+    longitude,
+    cloud_cover=0,
+    show_constellations=True,
+    filename="sky.png"
+):
+    """
+    Computes a snapshot and renders it in one go.
+
+    Returns (filepath, visible_planets).
+    """
+    snapshot = compute_snapshot(date, time, latitude, longitude, cloud_cover)
+
+    filepath = render_sky_image(
+        snapshot,
+        show_constellations=show_constellations,
+        filename=filename,
+    )
+
+    return filepath, snapshot.visible_planets
+
+
+# ==========================
+# Vector payload (client-side rendering)
+# ==========================
+PAYLOAD_VERSION = 1
+
+
+def _r(v):
+    # 1/1000 of the sky disc is well under a pixel on screen
+    return round(float(v), 3)
+
+
+def build_sky_payload(snapshot, show_constellations=True, seed=None, satellites=None):
+    """
+    Compact description of everything render_sky_image() draws, in the
+    same 0–1 sky coordinates, for drawing in the browser (sky_canvas.py).
+
+    Background stars are random anyway, so only their count and a seed
+    are sent and the client generates them.
+    """
+    cloud_cover = snapshot.cloud_cover or 0
+    star_visibility = max(0.35, 1 - cloud_cover / 120)
+
+    stars = []
+    lines = []
+
+    if show_constellations:
+        for name, pts in snapshot.constellation_geometry().items():
+
+            xy = [project_star_to_sky(az, alt) for (_, alt, az) in pts]
+
+            for (star, _, _), (x, y) in zip(pts, xy):
+                stars.append([_r(x), _r(y), STAR_MAGNITUDES.get(star, 3.0)])
+
+            if len(xy) >= 2:
+                lines.append([[_r(x), _r(y)] for x, y in xy])
+
+    planets = []
+    for name, alt, az in snapshot.planets:
+
+        if alt <= 0:
+            continue
+
+        px = 0.5 + np.sin(np.radians(az)) * 0.35
+        py = 0.5 + np.cos(np.radians(az)) * 0.35
+        planets.append([name, _r(px), _r(py)])
+
+    moon = None
+    if snapshot.moon_alt > 0:
+        mx = 0.5 + np.sin(np.radians(snapshot.moon_az)) * 0.32
+        my = 0.5 + np.cos(np.radians(snapshot.moon_az)) * 0.32
+
+        moon_r = 0.05
+        offset = (0.5 - snapshot.moon_illumination / 100) * (moon_r * 2)
+
+        # [x, y, shadow radius, shadow x-offset]
+        moon = [_r(mx), _r(my), moon_r, _r(offset)]
+
+    # [x, y, naked-eye visible (0/1)] plus a label for the well-known ones
+    sats = []
+    if satellites is not None and len(satellites):
+        xs, ys = project_star_to_sky(satellites.az, satellites.alt)
+        for name, x, y, lit in zip(satellites.names, xs, ys, satellites.naked_eye):
+            entry = [_r(x), _r(y), int(lit)]
+            if name.startswith(LABELLED_SATELLITES):
+                entry.append(name.split(" (")[0])
+            sats.append(entry)
+
+    return {
+        "v": PAYLOAD_VERSION,
+        "bg": {
+            "n": 500,
+            "seed": random.getrandbits(31) if seed is None else seed,
+            "alpha": _r(0.9 * star_visibility),
+        },
+        "stars": stars,
+        "lines": lines,
+        "planets": planets,
+        "moon": moon,
+        "sats": sats,
+    }
+
+
+def encode_sky_payload(payload):
+    return json.dumps(payload, separators=(",", ":"))
+
+
+# ==========================
+# Progressive rendering (preview, then refine)
+# ==========================
+def _hex_rgba(color, alpha):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4)) + (int(255 * alpha),)
+
 
-    return filepath, visible_planets
+def render_sky_preview(snapshot, filename="sky.png", size="display",
+                       show_constellations=True, satellites=None):
+    """
+    Quick low-fidelity version of render_sky_image(): the vector payload
+    drawn straight onto a bitmap with PIL (no glow layers, no matplotlib),
+    in a few milliseconds. Written as `{stem}_preview.png`.
+    """
+    payload = build_sky_payload(snapshot, show_constellations, satellites=satellites)
+
+    S = render_px(size)
+    image = Image.new("RGB", (S, S), "#02030c")
+    draw = ImageDraw.Draw(image, "RGBA")
+    font = ImageFont.load_default()
+
+    # same units as sky_canvas.py: sky 0..1 with y up, scatter area in pt^2
+    def X(x):
+        return x * S
+
+    def Y(y):
+        return (1 - y) * S
+
+    def disc(x, y, r, color, alpha):
+        r = max(0.5, r)
+        draw.ellipse((X(x) - r, Y(y) - r, X(x) + r, Y(y) + r), fill=_hex_rgba(color, alpha))
+
+    def dot(x, y, area, color, alpha):
+        disc(x, y, np.sqrt(area) / 2 / 432 * S, color, alpha)
+
+    def label(text, x, y, color="#ffffff"):
+        draw.text((X(x) - draw.textlength(text, font=font) / 2, Y(y)), text,
+                  fill=color, font=font)
+
+    rng = random.Random(payload["bg"]["seed"])
+    for _ in range(payload["bg"]["n"]):
+        color = rng.choices(["#ffffff", "#dbe9ff", "#ffe7c7"], [0.6, 0.25, 0.15])[0]
+        dot(rng.random(), rng.random(), rng.uniform(10, 60), color, payload["bg"]["alpha"])
+
+    for line in payload["lines"]:
+        draw.line([(X(x), Y(y)) for x, y in line], fill=_hex_rgba("#8fa4ff", 0.65),
+                  width=max(1, round(1.4 / 432 * S)))
+
+    for name, x, y in payload["planets"]:
+        dot(x, y, 280, "#ffd27d", 1.0)
+        label(name, x, y - 0.05)
+
+    for x, y, lit, *name in payload["sats"]:
+        dot(x, y, 12 if lit else 4, "#9df2ff" if lit else "#5f6b8f", 0.95 if lit else 0.5)
+
+    if payload["moon"]:
+        x, y, r, offset = payload["moon"]
+        dot(x, y, 650, "#ffffff", 0.95)
+        disc(x + offset, y, r * S, "#02030c", 1.0)
+        label("Moon", x, y - 0.07)
+
+    outputs.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    filepath = outputs.OUTPUT_DIR / f"{Path(filename).stem}_preview.png"
+
+    tmp = filepath.with_name(f".{uuid.uuid4().hex[:6]}.{filepath.name}")
+    image.save(tmp)
+    tmp.replace(filepath)
+
+    outputs.prune_outputs()
+    return filepath
+
+
+class Refinement:
+    """
+    A full-quality render running in the background. result() returns
+    {size_name: filepath} or raises CancelledError once superseded.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+# Figures are independent objects on the Agg canvas, so renders can run
+# side by side; the pool size bounds how many run at once
+_refine_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sky-refine")
+
+_latest_refinement = {}
+_latest_lock = threading.Lock()
+
+
+def _refine(refinement, session, snapshot, sizes, show_constellations, filename, satellites):
+    try:
+        if refinement.cancelled:
+            raise CancelledError()
+
+        fig = draw_sky(snapshot, show_constellations, satellites)
+
+        if refinement.cancelled:
+            raise CancelledError()
+
+        return save_sky_sizes(fig, filename, sizes)
+
+    finally:
+        with _latest_lock:
+            if _latest_refinement.get(session) is refinement:
+                del _latest_refinement[session]
+
+
+def start_refinement(snapshot, sizes=("display",), show_constellations=True,
+                     filename="sky.png", satellites=None, session=None):
+    """
+    Queues the full render. A newer refinement for the same `session`
+    cancels the previous one (before it starts, or before it writes).
+    """
+    refinement = Refinement()
+
+    if session is not None:
+        with _latest_lock:
+            stale = _latest_refinement.get(session)
+            _latest_refinement[session] = refinement
+        if stale is not None:
+            stale.cancel()
+
+    refinement.future = _refine_pool.submit(
+        _refine, refinement, session, snapshot, sizes,
+        show_constellations, filename, satellites,
+    )
+    return refinement
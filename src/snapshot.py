@@ -0,0 +1,312 @@
+"""
+One evaluation of the sky for a given instant and site.
+
+compute_snapshot() runs every Skyfield call the app needs exactly once
+(one geocentric and one topocentric Earth position) and packs the result
+into a small SkySnapshot. The renderer, the AI interpreter and the voice
+narration all read from the same snapshot.
+"""
+
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+from skyfield.api import load, wgs84, Star
+
+from ephemeris import load_ephemeris, coverage
+
+from weather import is_moon_hidden_by_clouds
+from memo import quantized_memo
+
+
+# ==========================
+# Skyfield setup
+# ==========================
+eph = load_ephemeris()
+ts = load.timescale()
+
+# dates the loaded kernel can answer for (the app's picker is clamped to it)
+EPHEMERIS_RANGE = coverage(eph)
+
+# ==========================
+# Planet keys
+# ==========================
+# Barycenters: DE440 (see ephemeris.py) has no planet-center segments;
+# Mars' barycenter is within a few cm of the planet, Venus' is the planet.
+PLANETS = {
+    "Jupiter": "jupiter barycenter",
+    "Saturn": "saturn barycenter",
+    "Mars": "mars barycenter",
+    "Venus": "venus barycenter",
+}
+
+# ==========================
+# Minimal constellation set
+# (we can expand later)
+# ==========================
+CONSTELLATIONS = {
+    "Orion": [
+        ("Betelgeuse", 88.79, 7.40),
+        ("Bellatrix", 81.28, 6.34),
+        ("Alnitak", 85.18, -1.94),
+        ("Alnilam", 84.05, -1.20),
+        ("Mintaka", 83.00, -0.29),
+        ("Saiph", 86.93, -9.66),
+        ("Rigel", 78.63, -8.20),
+    ],
+    "Cassiopeia": [
+        ("Schedar", 10.12, 56.53),
+        ("Caph", 2.29, 59.14),
+        ("Ruchbah", 10.12, 60.23),
+        ("Tsih", 14.17, 60.71),
+        ("Segin", 28.59, 63.67),
+    ],
+    "Ursa Major": [
+        ("Dubhe", 165.46, 61.75),
+        ("Merak", 165.93, 56.38),
+        ("Phecda", 178.45, 53.69),
+        ("Megrez", 183.85, 57.03),
+        ("Alioth", 193.50, 55.95),
+        ("Mizar", 200.98, 54.92),
+        ("Alkaid", 206.88, 49.31),
+    ],
+}
+
+# approximate visual magnitudes (used for client-side star sizes)
+STAR_MAGNITUDES = {
+    "Betelgeuse": 0.5, "Bellatrix": 1.6, "Alnitak": 1.8, "Alnilam": 1.7,
+    "Mintaka": 2.2, "Saiph": 2.1, "Rigel": 0.1,
+    "Schedar": 2.2, "Caph": 2.3, "Ruchbah": 2.7, "Tsih": 2.2, "Segin": 3.4,
+    "Dubhe": 1.8, "Merak": 2.4, "Phecda": 2.4, "Megrez": 3.3,
+    "Alioth": 1.8, "Mizar": 2.2, "Alkaid": 1.9,
+}
+
+# flattened once so every star is observed in a single vectorized call
+_STAR_INDEX = [
+    (constellation, name)
+    for constellation, stars in CONSTELLATIONS.items()
+    for (name, _, _) in stars
+]
+_STAR_RA = np.array([ra for stars in CONSTELLATIONS.values() for (_, ra, _) in stars])
+_STAR_DEC = np.array([dec for stars in CONSTELLATIONS.values() for (_, _, dec) in stars])
+CATALOG_STARS = Star(ra_hours=_STAR_RA / 15, dec_degrees=_STAR_DEC)
+
+
+def moon_phase_name(illuminated):
+    if illuminated < 5:
+        return "New Moon"
+    elif illuminated < 35:
+        return "Crescent"
+    elif illuminated < 65:
+        return "First Quarter / Half Moon"
+    elif illuminated < 95:
+        return "Gibbous"
+    return "Full Moon"
+
+
+# ==========================
+# Snapshot object
+# ==========================
+class SkySnapshot:
+    """
+    Compact, picklable state of the sky at one instant and site.
+
+    Angles are in degrees. `planets` holds (name, alt, az) for every
+    tracked planet; `stars` holds (constellation, star, alt, az) for the
+    catalog stars above the horizon only.
+    """
+
+    __slots__ = (
+        "datetime_utc",
+        "latitude",
+        "longitude",
+        "sun_alt",
+        "sun_az",
+        "moon_alt",
+        "moon_az",
+        "moon_illumination",
+        "moon_phase_name",
+        "planets",
+        "stars",
+        "cloud_cover",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def __repr__(self):
+        return (
+            f"SkySnapshot({self.datetime_utc.isoformat()} "
+            f"@ {self.latitude:.4f},{self.longitude:.4f})"
+        )
+
+    @property
+    def visible_planets(self):
+        return [name for name, alt, _ in self.planets if alt > 0]
+
+    @property
+    def moon_status(self):
+        if self.moon_alt < 0:
+            return "Below horizon"
+        if is_moon_hidden_by_clouds(
+            cloud_cover=self.cloud_cover or 0,
+            moon_altitude=self.moon_alt,
+        ):
+            return "Cloud obscured"
+        return "Visible"
+
+    def constellation_geometry(self):
+        """
+        {constellation: [(star, alt, az), ...]} in catalog order.
+        """
+        geometry = {name: [] for name in CONSTELLATIONS}
+        for constellation, star, alt, az in self.stars:
+            geometry[constellation].append((star, alt, az))
+        return geometry
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return SkySnapshot(**fields)
+
+    def with_cloud_cover(self, cloud_cover):
+        return self.replace(cloud_cover=cloud_cover)
+
+    def moon_dict(self):
+        """
+        Same shape as moon.get_moon_data() has always returned.
+        """
+        return {
+            "phase_name": self.moon_phase_name,
+            "illumination": round(self.moon_illumination, 1),
+            "altitude": round(self.moon_alt, 2),
+            "azimuth": round(self.moon_az, 2),
+            "datetime_utc": self.datetime_utc,
+        }
+
+    def to_dict(self):
+        return {
+            "datetime_utc": self.datetime_utc.isoformat(),
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "sun": {"altitude": round(self.sun_alt, 2), "azimuth": round(self.sun_az, 2)},
+            "moon": {
+                "phase_name": self.moon_phase_name,
+                "illumination": round(self.moon_illumination, 1),
+                "altitude": round(self.moon_alt, 2),
+                "azimuth": round(self.moon_az, 2),
+                "status": self.moon_status,
+            },
+            "planets": [
+                {"name": name, "altitude": round(alt, 2), "azimuth": round(az, 2)}
+                for name, alt, az in self.planets
+            ],
+            "stars": [
+                {"constellation": c, "star": s, "altitude": round(alt, 2), "azimuth": round(az, 2)}
+                for c, s, alt, az in self.stars
+            ],
+            "cloud_cover": self.cloud_cover,
+        }
+
+
+# ==========================
+# Compute
+# ==========================
+@quantized_memo()
+def compute_sky(date, time, latitude, longitude):
+    """
+    The astronomy part of a snapshot (no weather). Memoized process-wide
+    on a quantized site/time key, see memo.py; compute_sky.stats() has
+    the hit rate.
+    """
+
+    dt = datetime.combine(date, time).replace(tzinfo=timezone.utc)
+    t = ts.from_datetime(dt)
+
+    earth = eph["earth"]
+    moon  = eph["moon"]
+    sun   = eph["sun"]
+
+    geocentric = earth.at(t)
+    topocentric = (earth + wgs84.latlon(latitude, longitude)).at(t)
+
+    # ------------------------------------------------
+    # 1) GEOCENTRIC VECTORS (for phase angle)
+    # ------------------------------------------------
+    m_vec = geocentric.observe(moon).position.km
+    s_vec = geocentric.observe(sun).position.km
+
+    # dot-product angle formula
+    dot = (m_vec * s_vec).sum()
+    m_mag = math.sqrt((m_vec * m_vec).sum())
+    s_mag = math.sqrt((s_vec * s_vec).sum())
+
+    # angle between vectors (degrees)
+    phase_angle = math.degrees(math.acos(dot / (m_mag * s_mag)))
+
+    # illumination fraction
+    illuminated = (1 + math.cos(math.radians(phase_angle))) / 2 * 100
+
+    # ------------------------------------------------
+    # 2) TOPOCENTRIC ALT-AZ (observer-based)
+    # ------------------------------------------------
+    def altaz(body):
+        alt, az, _ = topocentric.observe(body).apparent().altaz()
+        return alt.degrees, az.degrees
+
+    moon_alt, moon_az = altaz(moon)
+    sun_alt, sun_az = altaz(sun)
+
+    planets = []
+    for name, key in PLANETS.items():
+        alt, az = altaz(eph[key])
+        planets.append((name, float(alt), float(az)))
+
+    star_alt, star_az = altaz(CATALOG_STARS)
+    stars = tuple(
+        (constellation, name, float(alt), float(az))
+        for (constellation, name), alt, az in zip(_STAR_INDEX, star_alt, star_az)
+        if alt > 0
+    )
+
+    return SkySnapshot(
+        datetime_utc=dt,
+        latitude=latitude,
+        longitude=longitude,
+        sun_alt=float(sun_alt),
+        sun_az=float(sun_az),
+        moon_alt=float(moon_alt),
+        moon_az=float(moon_az),
+        moon_illumination=illuminated,
+        moon_phase_name=moon_phase_name(illuminated),
+        planets=tuple(planets),
+        stars=stars,
+    )
+
+
+def check_date(date):
+    """
+    Raises ValueError for dates the loaded ephemeris cannot answer for.
+    (Skyfield's own range error does not survive pickling back from an
+    API worker.)
+    """
+    first, last = EPHEMERIS_RANGE
+    if not first <= date <= last:
+        raise ValueError(f"date must be between {first} and {last} for the loaded ephemeris")
+
+
+def compute_snapshot(date, time, latitude, longitude, cloud_cover=None):
+    """
+    Snapshot for exactly the requested instant and site. Only the
+    astronomy comes from the memo (computed at the quantized key); the
+    time, coordinates and weather are the caller's.
+    """
+    check_date(date)
+
+    return compute_sky(date, time, latitude, longitude).replace(
+        datetime_utc=datetime.combine(date, time).replace(tzinfo=timezone.utc),
+        latitude=latitude,
+        longitude=longitude,
+        cloud_cover=cloud_cover,
+    )
@@ -0,0 +1,57 @@
+"""
+Offline stand-ins for the external services used by the app.
+
+Open-Meteo, Nominatim and Google TTS all need the network. These stubs
+return deterministic values so the compute core (and the HTTP API) can be
+exercised on a machine with no internet access.
+"""
+
+import hashlib
+
+
+# ===============================
+# Weather (Open-Meteo)
+# ===============================
+def stub_cloud_cover(latitude, longitude, date=None, time=None):
+    """
+    Deterministic cloud cover (%) derived from the coordinates.
+    """
+    seed = f"{latitude:.2f},{longitude:.2f}".encode()
+    return int(hashlib.sha1(seed).hexdigest(), 16) % 101
+
+
+# ===============================
+# Geocoding (Nominatim)
+# ===============================
+STUB_CITIES = {
+    "bangalore": (12.97, 77.59),
+    "new york": (40.71, -74.00),
+    "london": (51.50, -0.12),
+    "paris": (48.85, 2.35),
+    "tokyo": (35.68, 139.69),
+    "sydney": (-33.87, 151.21),
+}
+
+def stub_lookup_city(city_name: str):
+    coords = STUB_CITIES.get(city_name.strip().lower())
+    if coords is None:
+        return None
+    return {
+        "city": city_name.strip().title(),
+        "lat": coords[0],
+        "lon": coords[1],
+    }
+
+
+# ===============================
+# Text-to-speech (gTTS)
+# ===============================
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, 417 bytes)
+SILENT_MP3_FRAME = bytes.fromhex("fffb9064") + bytes(413)
+
+def stub_synthesize_sentence(sentence: str):
+    """
+    Silent MP3 bytes for one sentence (see ai_voice.NarrationStream).
+    """
+    return SILENT_MP3_FRAME * max(1, len(sentence) // 40)
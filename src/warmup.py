@@ -0,0 +1,205 @@
+"""
+Background cache warm-up.
+
+Most requests are for the preset cities at the next few hours or the
+default 21:00, so a background thread runs the full pipeline for those
+ahead of time: the forecast cache, the snapshot memo, the rendered image
+and the narration audio are all in place before the first user asks.
+
+Warm-up never competes with users: it waits while any interactive
+request is in flight and leaves at least `min_gap` seconds between its
+own requests. stats() reports how many interactive requests landed on a
+warmed entry.
+
+Settings: ASTRO_WARMUP=0 (disable), ASTRO_WARMUP_HOURS (upcoming hours
+per site), ASTRO_WARMUP_INTERVAL (seconds between rounds), ASTRO_WARMUP_GAP
+(seconds between warm requests).
+"""
+
+import os
+import threading
+import time as time_mod
+from datetime import datetime, time as dt_time, timedelta
+
+import pipeline
+from geo import PRESET_CITIES
+from snapshot import compute_sky
+
+
+WARMUP_ENABLED = os.environ.get("ASTRO_WARMUP", "1") != "0"
+WARMUP_HOURS = int(os.environ.get("ASTRO_WARMUP_HOURS", 3))
+WARMUP_INTERVAL = float(os.environ.get("ASTRO_WARMUP_INTERVAL", 900))
+WARMUP_GAP = float(os.environ.get("ASTRO_WARMUP_GAP", 2.0))
+
+# the time picker's default
+DEFAULT_TIMES = (dt_time(21, 0),)
+
+
+class WarmupScheduler:
+
+    def __init__(self, sites=None, hours_ahead=WARMUP_HOURS, times=DEFAULT_TIMES,
+                 interval=WARMUP_INTERVAL, min_gap=WARMUP_GAP,
+                 output="png", image_sizes=("display",), with_voice=True):
+        self.sites = dict(PRESET_CITIES if sites is None else sites)
+        self.hours_ahead = hours_ahead
+        self.times = times
+        self.interval = interval
+        self.min_gap = min_gap
+        self.output = output
+        self.image_sizes = image_sizes
+        self.with_voice = with_voice
+
+        self.warmed = set()          # memo keys warmed, for instants not yet past
+        self.rounds = 0
+        self.warm_runs = 0
+        self.failures = 0
+        self.waited_s = 0.0
+        self.requests = 0
+        self.hits = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_run = 0.0
+
+    # ---------------- plan ----------------
+    def plan(self, now=None):
+        """
+        (location, date, time, lat, lon) for every site at the next
+        `hours_ahead` whole hours and at the fixed `times` still ahead
+        today (else tomorrow). Times are UTC, like the app's.
+        """
+        now = now or datetime.utcnow()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+
+        instants = [hour + timedelta(hours=h) for h in range(1, self.hours_ahead + 1)]
+        for t in self.times:
+            at = datetime.combine(now.date(), t)
+            instants.append(at if at > now else at + timedelta(days=1))
+
+        instants = sorted(set(instants))
+
+        return [
+            (location, at.date(), at.time(), lat, lon)
+            for at in instants
+            for location, (lat, lon) in self.sites.items()
+        ]
+
+    # ---------------- throttling ----------------
+    def _wait_turn(self):
+        """
+        Blocks until no interactive request is running and `min_gap`
+        has passed since the last warm request. False once stopped.
+        """
+        started = time_mod.monotonic()
+
+        while not self._stop.is_set():
+            wait = self._last_run + self.min_gap - time_mod.monotonic()
+            if pipeline.interactive_in_flight() == 0 and wait <= 0:
+                break
+            self._stop.wait(max(0.05, min(wait, 0.25)))
+
+        with self._lock:
+            self.waited_s += time_mod.monotonic() - started
+
+        return not self._stop.is_set()
+
+    # ---------------- work ----------------
+    def forget_past(self, now=None):
+        """
+        Drops warmed keys for instants before the current hour, so the
+        set stays about one plan() long however long the scheduler runs.
+        """
+        hour = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            self.warmed = {
+                key for key in self.warmed
+                if datetime.combine(key[0], key[1]) >= hour
+            }
+
+    def run_once(self, now=None):
+        """
+        One warm-up round over plan(). Returns how many entries were warmed.
+        """
+        warmed = 0
+        self.forget_past(now)
+
+        for location, date, time, lat, lon in self.plan(now):
+            if not self._wait_turn():
+                break
+
+            try:
+                pipeline.generate_sky(
+                    location, date, time, lat, lon,
+                    with_voice=self.with_voice,
+                    output=self.output,
+                    image_sizes=self.image_sizes,
+                    warm=True,
+                )
+            except Exception as e:
+                print("Warm-up failed:", location, date, time, e)
+                with self._lock:
+                    self.failures += 1
+            else:
+                with self._lock:
+                    self.warmed.add(compute_sky.key(date, time, lat, lon))
+                    self.warm_runs += 1
+                warmed += 1
+            finally:
+                self._last_run = time_mod.monotonic()
+
+        with self._lock:
+            self.rounds += 1
+
+        return warmed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # ---------------- reporting ----------------
+    def record_request(self, date, time, latitude, longitude):
+        """
+        Called by pipeline.generate_sky() for every interactive request.
+        """
+        key = compute_sky.key(date, time, latitude, longitude)
+        with self._lock:
+            self.requests += 1
+            self.hits += key in self.warmed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "warm_runs": self.warm_runs,
+                "failures": self.failures,
+                "warmed_entries": len(self.warmed),
+                "still_cached": sum(key in compute_sky for key in self.warmed),
+                "interactive_requests": self.requests,
+                "warm_hits": self.hits,
+                "hit_rate": round(self.hits / self.requests, 4) if self.requests else 0.0,
+                "waited_s": round(self.waited_s, 1),
+            }
+
+
+def start_warmup(**kwargs):
+    """
+    Starts a scheduler and hooks it into the pipeline. Returns None when
+    disabled with ASTRO_WARMUP=0.
+    """
+    if not WARMUP_ENABLED:
+        return None
+
+    scheduler = WarmupScheduler(**kwargs)
+    pipeline.warm_scheduler = scheduler
+    return scheduler.start()
@@ -1,8 +1,64 @@
+import os
+import threading
+import time as time_mod
 import requests
 from datetime import datetime
 
+from singleflight import SingleFlight
 
-OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+OPEN_METEO_URL = os.environ.get(
+    "ASTRO_OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast"
+)
+
+# One response holds a week of hourly values, so it is reused for a while
+FORECAST_TTL = float(os.environ.get("ASTRO_WEATHER_TTL", 1800))
+
+_forecasts = {}
+_forecasts_lock = threading.Lock()
+
+# concurrent misses for one site share a single request
+_forecast_flight = SingleFlight("forecast", timeout=15)
+
+
+def hourly_cloud_cover(latitude, longitude):
+    """
+    (times, cloudcover) hourly forecast lists for a site, cached for
+    FORECAST_TTL seconds per site rounded to 0.01° (the forecast grid is
+    much coarser). Raises on request failure; failures are not cached.
+    """
+    key = (round(float(latitude), 2), round(float(longitude), 2))
+
+    with _forecasts_lock:
+        cached = _forecasts.get(key)
+    if cached and time_mod.monotonic() - cached[0] < FORECAST_TTL:
+        return cached[1]
+
+    return _forecast_flight.do(key, _fetch_forecast, key)
+
+
+def _fetch_forecast(key):
+    params = {
+        "latitude": key[0],
+        "longitude": key[1],
+        "hourly": "cloudcover",
+        "timezone": "auto"
+    }
+
+    response = requests.get(OPEN_METEO_URL, params=params, timeout=10)
+    response.raise_for_status()
+
+    data = response.json()
+    forecast = (data["hourly"]["time"], data["hourly"]["cloudcover"])
+
+    now = time_mod.monotonic()
+    with _forecasts_lock:
+        if len(_forecasts) >= 1024:
+            for k in [k for k, (t, _) in _forecasts.items() if now - t >= FORECAST_TTL]:
+                del _forecasts[k]
+        _forecasts[key] = (now, forecast)
+
+    return forecast
 
 
 def get_cloud_cover(latitude, longitude, date=None, time=None):
@@ -20,20 +76,7 @@ def get_cloud_cover(latitude, longitude, date=None, time=None):
         else:
             dt = datetime.combine(date, time)
 
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "cloudcover",
-            "timezone": "auto"
-        }
-
-        response = requests.get(OPEN_METEO_URL, params=params, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-
-        times = data["hourly"]["time"]
-        clouds = data["hourly"]["cloudcover"]
+        times, clouds = hourly_cloud_cover(latitude, longitude)
 
         # Find closest hour index
         target_time = dt.strftime("%Y-%m-%dT%H:00")
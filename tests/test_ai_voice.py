@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+import ai_voice
+
+
+TEXT = "The Moon is a waxing crescent. It is 40 percent lit. Clear skies over Paris."
+SEGMENTS = [
+    ("The Moon is", True), ("a waxing crescent.", True),
+    ("It is", True), ("40", True), ("percent lit.", True),
+    ("Clear skies over", True), ("Paris.", False),
+]
+
+
+@pytest.fixture
+def audio_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_voice, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(ai_voice, "CLIP_DIR", tmp_path / "clips")
+    monkeypatch.setattr(ai_voice, "CLIP_FILL_GAP_S", 0)
+    return tmp_path
+
+
+def counting_synthesizer():
+    calls = []
+
+    def synthesize_counted(text):
+        calls.append(text)
+        return b"\xff\xfb" + text.encode()
+
+    return synthesize_counted, calls
+
+
+def wait_for_clips(texts, synthesize, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not all(ai_voice.clip_path(t, synthesize).exists() for t in texts):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_split_sentences():
+    assert ai_voice.split_sentences("**Tonight** the sky is clear.  \nVenus is up!") == [
+        "Tonight the sky is clear.", "Venus is up!",
+    ]
+
+
+def test_cold_clip_library_speaks_sentences(audio_dir):
+    synthesize, calls = counting_synthesizer()
+
+    narration = ai_voice.NarrationStream(TEXT, synthesize, SEGMENTS)
+    narration.result(timeout=5)
+
+    # one call per sentence, not one per missing phrase
+    assert narration.tts_calls == 3
+    assert (audio_dir / narration.file_path.name).exists()
+
+    # the missing clips are built in the background...
+    reusable = [text for text, reusable in SEGMENTS if reusable]
+    wait_for_clips(reusable, synthesize)
+
+    # ...so the next narration only needs the free text live
+    calls.clear()
+    narration = ai_voice.NarrationStream(TEXT + " ", synthesize, SEGMENTS)
+    narration.result(timeout=5)
+    assert narration.tts_calls == 1
+    assert calls == ["Paris."]
+
+
+def test_assembles_from_clips_when_few_are_missing(audio_dir):
+    synthesize, calls = counting_synthesizer()
+    ai_voice.build_clip_library(synthesize, [t for t, r in SEGMENTS[:-2] if r])
+    calls.clear()
+
+    narration = ai_voice.NarrationStream(TEXT, synthesize, SEGMENTS)
+    chunks = b"".join(narration.chunks(timeout=5))
+
+    # "Clear skies over" and "Paris." beat three sentences
+    assert calls == ["Clear skies over", "Paris."]
+    assert chunks.count(b"\xff\xfb") == len(SEGMENTS)
+
+
+def test_existing_narration_is_reused(audio_dir):
+    synthesize, calls = counting_synthesizer()
+
+    first = ai_voice.NarrationStream(TEXT, synthesize).result(timeout=5)
+    calls.clear()
+
+    again = ai_voice.NarrationStream(TEXT, synthesize)
+    assert again.reused
+    assert again.result(timeout=5) == first
+    assert calls == []
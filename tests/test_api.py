@@ -0,0 +1,262 @@
+"""
+Drives the HTTP API end to end with make_server(offline=True): real
+worker processes, stubbed weather / geocoding / TTS, no network. The
+server tests need an ephemeris file on disk (ASTRO_EPHEMERIS, the built
+excerpt or de421.bsp in the working directory), since workers load it at
+start-up.
+"""
+
+import io
+import json
+import os
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import api
+from ephemeris import ephemeris_path
+
+
+EPHEMERIS = Path(ephemeris_path())
+
+QUERY = "lat=51.5&lon=-0.12&date=2025-03-14&time=21:07"
+
+
+@pytest.fixture(scope="module")
+def workdir(tmp_path_factory):
+    if not EPHEMERIS.exists():
+        pytest.skip("needs a local ephemeris file (see ephemeris.py)")
+
+    # outputs (images, audio) land in a scratch directory
+    saved_cwd, saved_env = os.getcwd(), os.environ.get("ASTRO_EPHEMERIS")
+    os.environ["ASTRO_EPHEMERIS"] = str(EPHEMERIS.resolve())
+    os.chdir(tmp_path_factory.mktemp("api"))
+    yield
+    os.chdir(saved_cwd)
+    if saved_env is None:
+        del os.environ["ASTRO_EPHEMERIS"]
+    else:
+        os.environ["ASTRO_EPHEMERIS"] = saved_env
+
+
+def _serve(**kwargs):
+    server = api.make_server(port=0, offline=True, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+def _stop(server):
+    server.shutdown()
+    server.server_close()
+    server.pool.shutdown()
+
+
+@pytest.fixture(scope="module")
+def base_url(workdir):
+    server, url = _serve(workers=1, queue_size=4, timeout=60)
+    yield url
+    _stop(server)
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=120) as r:
+            return r.status, r.headers.get("Content-Type"), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("Content-Type"), e.read()
+
+
+def get_json(url):
+    status, _, body = get(url)
+    return status, json.loads(body) if body else None
+
+
+def test_health(base_url):
+    status, body = get_json(f"{base_url}/health")
+    assert status == 200
+    assert body["workers"] == 1
+
+
+def test_moon_keeps_requested_time(base_url):
+    status, body = get_json(f"{base_url}/moon?{QUERY}")
+    assert status == 200
+    assert {"phase_name", "illumination", "altitude", "azimuth"} <= set(body)
+    assert body["datetime_utc"] == "2025-03-14T21:07:00+00:00"
+
+
+@pytest.mark.parametrize("path", ["/planets", "/constellations", "/narration", "/sky"])
+def test_json_routes(base_url, path):
+    status, body = get_json(f"{base_url}{path}?{QUERY}")
+    assert status == 200
+    assert body is not None
+
+
+def test_sky_payload(base_url):
+    status, body = get_json(f"{base_url}/sky.json?{QUERY}")
+    assert status == 200
+    assert body["v"] == 1
+    assert body["bg"]["n"] == 500
+
+
+def test_image(base_url):
+    status, content_type, body = get(f"{base_url}/image?{QUERY}&size=thumbnail")
+    assert status == 200
+    assert content_type == "image/png"
+    assert body.startswith(b"\x89PNG")
+
+
+@pytest.mark.parametrize("size, px", [("200", 200), ("9000", 2048)])
+def test_image_pixel_size(base_url, size, px):
+    status, _, body = get(f"{base_url}/image?{QUERY}&size={size}")
+    assert status == 200
+    assert Image.open(io.BytesIO(body)).size == (px, px)
+
+
+@pytest.mark.parametrize("path", ["/audio", "/audio/stream"])
+def test_audio(base_url, path):
+    status, content_type, body = get(f"{base_url}{path}?{QUERY}")
+    assert status == 200
+    assert content_type == "audio/mpeg"
+    assert body.startswith(b"\xff\xfb")
+
+
+def test_geocode(base_url):
+    status, body = get_json(f"{base_url}/geocode?city=Paris")
+    assert status == 200
+    assert body["lat"] == pytest.approx(48.86, abs=0.01)
+
+    status, _ = get_json(f"{base_url}/geocode?city=Atlantis")
+    assert status == 404
+
+
+def test_stats(base_url):
+    status, body = get_json(f"{base_url}/stats")
+    assert status == 200
+    assert "sky_memo" in body and "single_flight" in body
+
+
+@pytest.mark.parametrize("query", [
+    "lon=0",                                  # lat missing
+    "lat=95&lon=0",                           # out of range
+    "lat=10&lon=0&date=1066-01-01",           # outside the ephemeris
+    f"{QUERY}&size=huge",                     # unknown image size
+    f"{QUERY}&size=0",                        # no pixels
+])
+def test_bad_requests(base_url, query):
+    path = "/image" if "size" in query else "/moon"
+    status, body = get_json(f"{base_url}{path}?{query}")
+    assert status == 400
+    assert body["error"]
+
+
+def test_unknown_endpoint(base_url):
+    status, _ = get_json(f"{base_url}/nope")
+    assert status == 404
+
+
+def test_timeout_and_backpressure(workdir):
+    # one worker, no queue, and less time than a full-size render takes
+    server, url = _serve(workers=1, queue_size=0, timeout=0.05)
+    try:
+        status, _ = get_json(f"{url}/image?{QUERY}&size=download")
+        assert status == 504
+
+        # the timed-out render still holds the only slot
+        status, _, _ = get(f"{url}/moon?{QUERY}")
+        assert status == 503
+
+        # ...until the worker abandons it at the same deadline
+        deadline = time.monotonic() + 10
+        while get_json(f"{url}/health")[1]["in_flight"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+    finally:
+        _stop(server)
+
+
+def test_stream_limit(workdir):
+    server, url = _serve(workers=1, streams=0)
+    try:
+        status, _, _ = get(f"{url}/audio/stream?{QUERY}")
+        assert status == 503
+
+        # other endpoints don't share the stream slots
+        status, _, _ = get(f"{url}/moon?{QUERY}")
+        assert status == 200
+    finally:
+        _stop(server)
+
+
+def test_stream_timeouts(workdir):
+    server, url = _serve(workers=1, timeout=2)
+    calls = []
+
+    def stalls_after_first(sentence):
+        calls.append(sentence)
+        if len(calls) > 1:
+            time.sleep(10)
+        return b"\xff\xfb" + bytes(64)
+
+    def stalls(sentence):
+        time.sleep(10)
+
+    try:
+        server.RequestHandlerClass.synthesize = staticmethod(stalls_after_first)
+        status, _, body = get(f"{url}/audio/stream?{QUERY}&location=Stallsville")
+        assert status == 200
+        assert body.startswith(b"\xff\xfb")       # cut short, not an error page
+
+        server.RequestHandlerClass.synthesize = staticmethod(stalls)
+        status, _ = get_json(f"{url}/audio/stream?{QUERY}&location=Nowhere")
+        assert status == 504
+    finally:
+        _stop(server)
+
+
+# ---------------- in-worker task wrapper ----------------
+def _stuck(params):
+    try:
+        time.sleep(30)
+    except Exception:        # what a broad handler in a task would do
+        time.sleep(30)
+
+
+def _bad_request(params):
+    raise ValueError("lat/lon out of range")
+
+
+class Unpicklable(Exception):
+    def __reduce__(self):
+        raise TypeError("can't pickle")
+
+
+def _library_error(params):
+    raise Unpicklable("ephemeris segment missing")
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="needs SIGALRM")
+def test_call_task_abandons_stuck_task():
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="abandoned"):
+        api._call_task(_stuck, {}, deadline=0.1)
+    assert time.monotonic() - started < 5
+
+    # the timer is cleared once the task returns
+    assert api._call_task(lambda params: params, {"ok": 1}, deadline=0.1) == {"ok": 1}
+    time.sleep(0.2)
+
+
+def test_call_task_plain_exceptions():
+    with pytest.raises(ValueError, match="out of range") as info:
+        api._call_task(_bad_request, {})
+    assert type(info.value) is ValueError
+
+    with pytest.raises(RuntimeError, match="Unpicklable: ephemeris segment missing"):
+        api._call_task(_library_error, {})
@@ -0,0 +1,170 @@
+import threading
+import time
+from datetime import date, time as dt_time
+
+import pytest
+
+from memo import SkyMemo
+
+
+DAY = date(2025, 3, 14)
+
+
+def counting(fn=None):
+    calls = []
+
+    def sky(date, time, latitude, longitude):
+        calls.append((date, time, latitude, longitude))
+        if fn is not None:
+            fn()
+        return (date, time, latitude, longitude)
+
+    return sky, calls
+
+
+def test_concurrent_misses_share_one_call():
+    release = threading.Event()
+    sky, calls = counting(lambda: release.wait(5))
+    memo = SkyMemo(sky)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(memo(DAY, dt_time(21, 0), 51.5, -0.12)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+
+    deadline = time.monotonic() + 5
+    while memo.stats()["coalesced"] < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 4 and len(set(results)) == 1
+    assert memo.stats()["misses"] == 1
+
+
+def test_waiters_time_out_on_a_stuck_computation(monkeypatch):
+    release = threading.Event()
+    sky, calls = counting(lambda: release.wait(5))
+    memo = SkyMemo(sky)
+    monkeypatch.setattr(memo._flight, "timeout", 0.05)
+
+    leader = threading.Thread(target=memo, args=(DAY, dt_time(21, 0), 51.5, -0.12))
+    leader.start()
+    while not calls:
+        time.sleep(0.005)
+
+    with pytest.raises(TimeoutError):
+        memo(DAY, dt_time(21, 0), 51.5, -0.12)
+
+    release.set()
+    leader.join()
+    assert (DAY, dt_time(21, 0), 51.5, -0.12) in memo
+
+
+def test_errors_are_not_cached():
+    attempts = []
+
+    def flaky(date, time, latitude, longitude):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("ephemeris busy")
+        return "ok"
+
+    memo = SkyMemo(flaky)
+    with pytest.raises(RuntimeError):
+        memo(DAY, dt_time(21, 0), 0, 0)
+
+    assert memo(DAY, dt_time(21, 0), 0, 0) == "ok"
+    assert memo.stats()["size"] == 1
+
+
+# ---------------- quantization ----------------
+def test_nearby_requests_share_a_key():
+    sky, calls = counting()
+    memo = SkyMemo(sky, site_precision=2, time_bucket_minutes=15)
+
+    first = memo(DAY, dt_time(21, 7), 51.5012, -0.1234)
+    again = memo(DAY, dt_time(21, 14, 59), 51.4951, -0.1249)
+
+    assert first is again
+    # the function only ever sees the quantized arguments
+    assert calls == [(DAY, dt_time(21, 0), 51.5, -0.12)]
+
+
+@pytest.mark.parametrize("time, site", [
+    (dt_time(21, 15), (51.5, -0.12)),       # next time bucket
+    (dt_time(21, 7), (51.51, -0.12)),       # next site cell
+])
+def test_requests_across_a_boundary_are_separate(time, site):
+    sky, calls = counting()
+    memo = SkyMemo(sky, site_precision=2, time_bucket_minutes=15)
+
+    memo(DAY, dt_time(21, 7), 51.5, -0.12)
+    memo(DAY, time, *site)
+    assert len(calls) == 2
+
+
+def test_other_dates_are_separate():
+    sky, calls = counting()
+    memo = SkyMemo(sky)
+
+    memo(DAY, dt_time(21, 0), 0, 0)
+    memo(date(2025, 3, 15), dt_time(21, 0), 0, 0)
+    assert len(calls) == 2
+
+
+# ---------------- LRU ----------------
+def test_least_recently_used_entry_goes_first():
+    sky, calls = counting()
+    memo = SkyMemo(sky, maxsize=2)
+    a, b, c = (memo.key(DAY, dt_time(h, 0), 0, 0) for h in (20, 21, 22))
+
+    memo(*a)
+    memo(*b)
+    memo(*a)            # a is now the most recently used
+    memo(*c)            # so b is evicted
+
+    assert a in memo and c in memo and b not in memo
+    assert memo.stats()["evictions"] == 1
+
+    memo(*b)
+    assert len(calls) == 4
+
+
+def test_configure_clears_on_new_quantization():
+    sky, calls = counting()
+    memo = SkyMemo(sky, maxsize=4, time_bucket_minutes=1)
+    for h in (20, 21, 22):
+        memo(DAY, dt_time(h, 0), 0, 0)
+
+    memo.configure(maxsize=2)           # size only: keeps the newest entries
+    assert memo.stats()["size"] == 2
+    assert memo.key(DAY, dt_time(22, 0), 0, 0) in memo
+
+    memo.configure(time_bucket_minutes=30)
+    assert memo.stats()["size"] == 0
+    memo(DAY, dt_time(22, 10), 0, 0)
+    assert calls[-1][1] == dt_time(22, 0)
+
+
+def test_stats_hit_rate():
+    sky, _ = counting()
+    memo = SkyMemo(sky, time_bucket_minutes=15)
+
+    memo(DAY, dt_time(21, 0), 0, 0)
+    for minute in (1, 5, 14):
+        memo(DAY, dt_time(21, minute), 0, 0)
+
+    stats = memo.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (3, 1, 1)
+    assert stats["hit_rate"] == 0.75
+    assert stats["time_bucket_minutes"] == 15
+
+    memo.clear()
+    assert memo.stats()["hit_rate"] == 0.0
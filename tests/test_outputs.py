@@ -0,0 +1,51 @@
+import os
+import time
+
+import pytest
+
+import outputs
+from outputs import prune_outputs, reuse_outputs
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(outputs, "OUTPUT_DIR", tmp_path)
+    return tmp_path
+
+
+def make_file(directory, name, size, age_s):
+    path = directory / name
+    path.write_bytes(b"\0" * size)
+    at = time.time() - age_s
+    os.utime(path, (at, at))
+    return path
+
+
+def test_prune_outputs_drops_least_recently_used(output_dir):
+    oldest = make_file(output_dir, "sky_a_display.png", 1000, age_s=3000)
+    older = make_file(output_dir, "sky_b_display.png", 1000, age_s=2000)
+    old = make_file(output_dir, "sky_c_display.png", 1000, age_s=1000)
+    other = make_file(output_dir, "notes.txt", 5000, age_s=9000)
+
+    assert prune_outputs(max_bytes=1500) == 2
+    assert not oldest.exists() and not older.exists()
+    assert old.exists() and other.exists()
+
+
+def test_prune_outputs_keeps_recent_and_reused_files(output_dir):
+    reused = make_file(output_dir, "sky_a_display.png", 1000, age_s=3000)
+    stale = make_file(output_dir, "sky_b_display.png", 1000, age_s=2000)
+    fresh = make_file(output_dir, "sky_c_preview.png", 1000, age_s=0)
+
+    assert reuse_outputs([reused])
+    assert not reuse_outputs([reused, output_dir / "sky_missing.png"])
+
+    # over the cap, but what's left was used within the grace period
+    assert prune_outputs(max_bytes=0.5) == 1
+    assert not stale.exists()
+    assert reused.exists() and fresh.exists()
+
+
+def test_prune_outputs_disabled(output_dir):
+    make_file(output_dir, "sky_a_display.png", 1000, age_s=3000)
+    assert prune_outputs(max_bytes=0) == 0
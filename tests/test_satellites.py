@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+from skyfield.api import EarthSatellite, load, wgs84
+
+import satellites
+
+
+SAMPLE_TLE = Path(__file__).resolve().parents[1] / "assets/tle/sample.tle"
+
+LONDON = (51.5, -0.12)
+EPOCH_DAY = datetime(2019, 12, 9, tzinfo=timezone.utc)
+
+# ISS sunlit flags from Skyfield's EarthSatellite.is_sunlit(de421) at
+# EPOCH_DAY + 0h, 2h, ... 22h (pinned so the test needs no ephemeris)
+ISS_SUNLIT = [False, True, True, False, True, True, True, False, True, True, False, True]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return satellites.load_tle_file(SAMPLE_TLE)
+
+
+@pytest.fixture(scope="module")
+def iss():
+    lines = SAMPLE_TLE.read_text().splitlines()
+    return EarthSatellite(lines[1], lines[2], lines[0], load.timescale())
+
+
+def test_parse_tle(catalog):
+    assert len(catalog) == 16
+    assert catalog.names[0] == "ISS (ZARYA)"
+    assert all(name.startswith("FIXTURE LEO-") for name in catalog.names[1:])
+
+
+def test_parse_bare_two_line_tle():
+    lines = SAMPLE_TLE.read_text().splitlines()
+    catalog = satellites.parse_tle("\n".join(lines[1:3]))
+
+    assert len(catalog) == 1
+    assert catalog.names[0] == "25544"
+
+
+def test_alt_az_matches_skyfield(catalog, iss):
+    ts = load.timescale()
+    site = wgs84.latlon(*LONDON)
+    times = [EPOCH_DAY + timedelta(hours=h) for h in range(0, 24, 2)]
+
+    alt, az, sunlit, _ = satellites.propagate(catalog, times, *LONDON)
+
+    for i, dt in enumerate(times):
+        ref_alt, ref_az, _ = (iss - site).at(ts.from_datetime(dt)).altaz()
+        assert alt[0, i] == pytest.approx(ref_alt.degrees, abs=0.01)
+        assert (az[0, i] - ref_az.degrees + 180) % 360 - 180 == pytest.approx(0, abs=0.01)
+
+    assert list(sunlit[0]) == ISS_SUNLIT
+
+
+def test_satellites_at(catalog, iss):
+    dt = datetime(2019, 12, 9, 16, 39, tzinfo=timezone.utc)
+    sats = satellites.satellites_at(catalog, dt, *LONDON)
+
+    assert np.all(sats.alt > 0)
+    assert "ISS (ZARYA)" in sats.names
+
+    i = list(sats.names).index("ISS (ZARYA)")
+    ref_alt, ref_az, _ = (iss - wgs84.latlon(*LONDON)).at(load.timescale().from_datetime(dt)).altaz()
+    assert sats.alt[i] == pytest.approx(ref_alt.degrees, abs=0.01)
+    assert sats.az[i] == pytest.approx(ref_az.degrees, abs=0.01)
+
+    # after dusk, sunlit ISS is a naked-eye object
+    assert sats.sun_alt < satellites.VISIBLE_SUN_ALT
+    assert sats.naked_eye[i]
+
+
+def test_predict_passes(catalog, iss):
+    start = datetime(2019, 12, 9, 16, 0, tzinfo=timezone.utc)
+    passes = satellites.predict_passes(catalog, *LONDON, start, hours=6, min_alt=10)
+
+    assert passes
+    assert [p["rise"] for p in passes] == sorted(p["rise"] for p in passes)
+
+    for p in passes:
+        assert p["rise"] <= p["culmination"] <= p["set"]
+        assert p["max_alt"] >= 10
+        assert p["visible"]
+
+    first_iss = next(p for p in passes if p["name"] == "ISS (ZARYA)")
+    assert first_iss["rise"] == datetime(2019, 12, 9, 16, 36, tzinfo=timezone.utc)
+
+    ref_alt, _, _ = (iss - wgs84.latlon(*LONDON)).at(
+        load.timescale().from_datetime(first_iss["culmination"])
+    ).altaz()
+    assert first_iss["max_alt"] == pytest.approx(ref_alt.degrees, abs=0.1)
+
+
+def test_predict_passes_includes_daylight_passes_on_request(catalog):
+    start = datetime(2019, 12, 9, 10, 0, tzinfo=timezone.utc)
+
+    visible = satellites.predict_passes(catalog, *LONDON, start, hours=4)
+    every = satellites.predict_passes(catalog, *LONDON, start, hours=4, visible_only=False)
+
+    assert not visible          # London midday: nothing is naked-eye
+    assert every
+    assert not any(p["visible"] for p in every)
+
+
+@pytest.mark.parametrize("when", [
+    datetime(1950, 6, 1, 21, 0, tzinfo=timezone.utc),
+    datetime(2090, 6, 1, 21, 0, tzinfo=timezone.utc),
+    EPOCH_DAY + timedelta(days=10),
+])
+def test_stale_elements_are_not_propagated(catalog, when):
+    assert len(catalog.current(when)) == 0
+    assert len(satellites.satellites_at(catalog, when, *LONDON, min_alt=-90)) == 0
+    assert satellites.predict_passes(catalog, *LONDON, when, hours=12, visible_only=False) == []
+
+
+def test_current_keeps_satellites_near_their_epoch():
+    lines = SAMPLE_TLE.read_text().splitlines()[:3]
+    later = [lines[0].replace("ISS", "LATER ISS"),
+             lines[1].replace(" 19343.", " 19353."), lines[2]]
+    catalog = satellites.parse_tle("\n".join(lines + later))
+
+    assert list(catalog.current(EPOCH_DAY).names) == ["ISS (ZARYA)"]
+    assert list(catalog.current(EPOCH_DAY + timedelta(days=10)).names) == ["LATER ISS (ZARYA)"]
+    assert len(catalog.current(EPOCH_DAY, EPOCH_DAY + timedelta(days=10))) == 0
+    assert list(catalog.current(EPOCH_DAY + timedelta(days=2)).names) == ["ISS (ZARYA)"]
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+import singleflight
+from singleflight import SingleFlight
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def start_callers(flight, key, fn, n, **kwargs):
+    """
+    n threads calling flight.do(key, fn); returns (threads, results) where
+    results collects each caller's value or exception.
+    """
+    results = []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn, **kwargs))
+        except BaseException as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def blocking(value=None, error=None):
+    """
+    fn that blocks until release is set, counting its calls.
+    """
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return value
+
+    return fn, release, calls
+
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight("test-share")
+    fn, release, calls = blocking(value=object())
+
+    threads, results = start_callers(flight, "k", fn, 5)
+    wait_until(lambda: flight.shared == 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r is results[0] for r in results)
+    assert flight.stats() == {
+        "executed": 1, "shared": 4, "timeouts": 0, "in_flight": 0, "shared_rate": 0.8,
+    }
+
+
+def test_nothing_is_kept_after_the_call():
+    flight = SingleFlight("test-no-cache")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("k", fn) == 1
+    assert flight.do("k", fn) == 2
+    assert flight.stats()["shared"] == 0
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test-keys")
+    fn, release, calls = blocking(value="v")
+
+    a, _ = start_callers(flight, "a", fn, 1)
+    b, _ = start_callers(flight, "b", fn, 1)
+    wait_until(lambda: len(calls) == 2)
+    assert flight.stats()["in_flight"] == 2
+
+    release.set()
+    for t in a + b:
+        t.join()
+
+
+def test_leader_error_reaches_every_waiter():
+    flight = SingleFlight("test-error")
+    error = ValueError("upstream said no")
+    fn, release, calls = blocking(error=error)
+
+    threads, results = start_callers(flight, "k", fn, 3)
+    wait_until(lambda: flight.shared == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [error, error, error]
+
+    # the failure isn't remembered either
+    with pytest.raises(ZeroDivisionError):
+        flight.do("k", lambda: 1 / 0)
+
+
+def test_waiter_gives_up_and_leader_carries_on():
+    flight = SingleFlight("test-timeout", timeout=5)
+    fn, release, calls = blocking(value="done")
+
+    leader, leader_result = start_callers(flight, "k", fn, 1)
+    wait_until(lambda: len(calls) == 1)
+
+    with pytest.raises(TimeoutError):
+        flight.do("k", fn, timeout=0.05)
+    assert flight.stats()["timeouts"] == 1
+
+    release.set()
+    leader[0].join()
+    assert leader_result == ["done"]
+
+
+def test_registry_reports_every_flight():
+    flight = SingleFlight("test-registry")
+    flight.do("k", lambda: None)
+
+    assert singleflight.REGISTRY["test-registry"] is flight
+    assert singleflight.stats()["test-registry"]["executed"] == 1
@@ -0,0 +1,97 @@
+"""
+Renderer tests. Need an ephemeris file on disk (ASTRO_EPHEMERIS, the
+built excerpt or de421.bsp in the working directory), since importing
+sky_generator loads it.
+"""
+
+from datetime import date, time
+from pathlib import Path
+
+import pytest
+
+from ephemeris import ephemeris_path
+
+
+pytestmark = pytest.mark.skipif(
+    not Path(ephemeris_path()).exists(), reason="needs a local ephemeris file (see ephemeris.py)"
+)
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    import matplotlib
+    matplotlib.use("Agg")
+
+    from snapshot import compute_snapshot
+    return compute_snapshot(date(2025, 3, 14), time(21, 7), 51.5, -0.12, cloud_cover=40)
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    import outputs
+
+    monkeypatch.setattr(outputs, "OUTPUT_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("size, px", [
+    ("display", 480), (720, 720), ("720", 720), (10, 32), (100_000, 2048),
+])
+def test_render_px(size, px):
+    from sky_generator import render_px
+    assert render_px(size) == px
+
+
+@pytest.mark.parametrize("size", ["huge", "", 0, -5, None])
+def test_render_px_rejects(size):
+    from sky_generator import render_px
+    with pytest.raises(ValueError):
+        render_px(size)
+
+
+def test_render_sizes_in_one_pass(snapshot, output_dir):
+    from PIL import Image
+    from sky_generator import render_sky_sizes
+
+    paths = render_sky_sizes(snapshot, ("thumbnail", 777, "9999"), filename="sky_t.png")
+
+    assert {size: Image.open(path).size for size, path in paths.items()} == {
+        "thumbnail": (160, 160), 777: (777, 777), "9999": (2048, 2048),
+    }
+    assert paths[777].name == "sky_t_777px.png"
+    assert paths["9999"].parent == output_dir
+
+
+def test_newer_refinement_cancels_the_session_previous_one(snapshot, output_dir, monkeypatch):
+    import threading
+    from concurrent.futures import CancelledError
+
+    import sky_generator
+
+    # hold the first render mid-draw until the second has been queued
+    release = threading.Event()
+    drawing = threading.Event()
+    draw_sky = sky_generator.draw_sky
+
+    def held_draw_sky(*args):
+        if not drawing.is_set():
+            drawing.set()
+            release.wait(10)
+        return draw_sky(*args)
+
+    monkeypatch.setattr(sky_generator, "draw_sky", held_draw_sky)
+
+    first = sky_generator.start_refinement(snapshot, filename="sky_a.png", session="s1")
+    assert drawing.wait(10)
+
+    other = sky_generator.start_refinement(snapshot, filename="sky_b.png", session="s2")
+    second = sky_generator.start_refinement(snapshot, filename="sky_c.png", session="s1")
+    assert first.cancelled and not second.cancelled and not other.cancelled
+
+    release.set()
+    with pytest.raises(CancelledError):
+        first.result(timeout=30)
+    assert not (output_dir / "sky_a_display.png").exists()
+
+    assert second.result(timeout=30)["display"] == output_dir / "sky_c_display.png"
+    assert other.result(timeout=30)["display"].exists()
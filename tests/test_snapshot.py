@@ -0,0 +1,64 @@
+"""
+compute_snapshot() on top of the quantized memo. Needs an ephemeris file
+on disk (ASTRO_EPHEMERIS, the built excerpt or de421.bsp in the working
+directory), since importing snapshot loads it.
+"""
+
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+
+import pytest
+
+from ephemeris import ephemeris_path
+
+
+pytestmark = pytest.mark.skipif(
+    not Path(ephemeris_path()).exists(), reason="needs a local ephemeris file (see ephemeris.py)"
+)
+
+DAY = date(2025, 3, 14)
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    import snapshot
+
+    monkeypatch.setattr(snapshot.compute_sky, "site_precision", 2)
+    monkeypatch.setattr(snapshot.compute_sky, "time_bucket_minutes", 15)
+    snapshot.compute_sky.clear()
+    yield snapshot
+    snapshot.compute_sky.clear()
+
+
+def test_snapshot_keeps_the_requested_instant_and_site(snapshot):
+    first = snapshot.compute_snapshot(DAY, time(21, 7, 30), 51.5012, -0.1234, cloud_cover=40)
+
+    assert first.datetime_utc == datetime(2025, 3, 14, 21, 7, 30, tzinfo=timezone.utc)
+    assert (first.latitude, first.longitude) == (51.5012, -0.1234)
+    assert first.cloud_cover == 40
+
+    # same memo entry, but again the caller's own values
+    second = snapshot.compute_snapshot(DAY, time(21, 14), 51.4951, -0.1249)
+    assert snapshot.compute_sky.stats()["hits"] == 1
+    assert second.datetime_utc == datetime(2025, 3, 14, 21, 14, tzinfo=timezone.utc)
+    assert (second.latitude, second.longitude) == (51.4951, -0.1249)
+    assert second.cloud_cover is None
+    assert second.planets == first.planets
+
+
+def test_narration_uses_the_requested_time(snapshot):
+    from ai_interpreter import generate_sky_description
+
+    text = generate_sky_description(
+        snapshot.compute_snapshot(DAY, time(21, 7), 51.5, -0.12), "London"
+    )
+    assert "09:07 PM" in text
+
+
+def test_dates_outside_the_ephemeris_are_rejected(snapshot):
+    first, last = snapshot.EPHEMERIS_RANGE
+
+    with pytest.raises(ValueError, match="loaded ephemeris"):
+        snapshot.compute_snapshot(date(last.year + 1, 1, 1), time(21, 0), 0, 0)
+    with pytest.raises(ValueError, match="loaded ephemeris"):
+        snapshot.compute_snapshot(date(first.year - 1, 1, 1), time(21, 0), 0, 0)